@@ -2,91 +2,252 @@
 import re
 
 
-RULE = re.compile('^(\w+)\($')
-NAME = re.compile('\s+name = "(.+)"')
-CRATE_NAME = re.compile('\s+crate_name = "(.+)"')
-CRATE = re.compile('\s+crate = "(.+)"')
-SRCS_GLOB = re.compile('\s+srcs = (glob\(\[.+),')
-SRCS_NO_GLOB = re.compile('\s+srcs = (\[.+\]),')
+# Lines of interest in a BUILD file formatted by buildifier, matched by one
+# pattern in a single pass over the text.
+LINE = re.compile(r'''
+    # Every alternative starts at a new line, the leading `\n` lets the regex
+    # engine jump between lines instead of trying every position. Indentation
+    # is matched once, the lookahead prevents backtracking into it.
+    \n(?=([ \t]*))\1
+    (?:
+    # Top level call, eg. `rust_library(`, with the rest of the line.
+      (\w+)\(([^\n]*)
+    # Attribute with a string value, eg. `    name = "sha",`.
+    | (crate_name|crate|name)[ \t]*=[ \t]*"((?:[^"\\\n]|\\.)*)",?[ \t]*$
+    # Single line sources, eg. `    srcs = glob(["src/**"]),`.
+    | srcs[ \t]*=[ \t]*((?:glob\()?\[[^\n()\[\]\#]*\]\)?),?[ \t]*$
+    # Any other attribute of interest, the value is read by tokens.
+    | (crate_name|crate|name|srcs)[ \t]*=(?!=)[ \t]*
+    # End of top level call.
+    | \)
+    )
+''', re.M | re.X)
+# Tokens inside a call. Everything else is skipped by the regex engine.
+TOKEN = re.compile(r'''
+    # Attribute with a plain string value, eg. `name = "sha"`.
+    \b(crate_name|crate|name)\s*=\s*"((?:[^"\\\n]|\\.)*)"(?=\s*[,)])
+    # Any other attribute of interest, the value is read until the next comma.
+  | \b(crate_name|crate|name|srcs)\s*=(?!=)
+    # Brackets without nested brackets, eg. a list of `deps`, as a single token.
+  | \[(?:[^()\[\]{}"'\#]|"(?:[^"\\\n]|\\.)*")*\]
+  | \((?:[^()\[\]{}"'\#]|"(?:[^"\\\n]|\\.)*")*\)
+  | """[\s\S]*?"""
+  | "(?:[^"\\\n]|\\.)*"
+  | '(?:[^'\\\n]|\\.)*'
+  | \#[^\n]*
+  | [()\[\]{},]
+''', re.X)
+STRING = re.compile(r'"(.*)"', re.S)
+INDENT = re.compile(r'[ \t]*')
+COMMENT = re.compile(r'#[^\n]*')
+SPACES = re.compile(r'\s*\n\s*')
+SPACES_AFTER_OPEN = re.compile(r'([(\[{]) ')
+SPACES_BEFORE_CLOSE = re.compile(r',? ([)\]}])')
+# Calls that are not rules.
+SKIPPED_CALLS = ['load', 'package', 'package_group', 'licenses', 'exports_files']
+
+
+def _compact(value, has_comment):
+    # Put multi-line values on a single line, eg. `glob(["**"], exclude = ["target/**"])`.
+    if has_comment:
+        value = COMMENT.sub('', value)
+    if '\n' in value:
+        value = SPACES.sub(' ', value)
+        value = SPACES_AFTER_OPEN.sub(r'\1', value)
+        value = SPACES_BEFORE_CLOSE.sub(r'\1', value)
+    return value.strip()
+
+
+def _set_attribute(entry, key, value, has_comment=False):
+    value = _compact(value, has_comment)
+    if key == 'srcs':
+        entry[key] = value
+    elif match := STRING.fullmatch(value):
+        entry[key] = match.group(1)
+
+
+def _read_value(text, pos):
+    # Returns attribute value text and its end position: the comma or the
+    # closing bracket of the call, whichever comes first outside of brackets.
+    depth = 0
+    has_comment = False
+    for match in TOKEN.finditer(text, pos):
+        token = match.group()
+        c = token[0]
+        if c in '([{':
+            if len(token) == 1:
+                depth += 1
+        elif c in ')]}':
+            depth -= 1
+            if depth < 0:
+                return text[pos:match.start()], match.start(), has_comment
+        elif c == '#':
+            has_comment = True
+        elif c == ',' and depth == 0:
+            return text[pos:match.start()], match.start(), has_comment
+    return text[pos:], len(text), has_comment
+
+
+def _parse_call(text, pos, entry):
+    # Parses call arguments token by token, for calls not formatted by
+    # buildifier. Returns position after the closing bracket of the call, or
+    # None if the call is not closed.
+    depth = 1
+    key = None
+    start = pos
+    has_comment = False
+    for match in TOKEN.finditer(text, pos):
+        token = match.group()
+        c = token[0]
+        if c in '([{':
+            if len(token) == 1:
+                depth += 1
+        elif c in ')]}':
+            depth -= 1
+            if depth == 0:
+                if key is not None:
+                    _set_attribute(entry, key, text[start:match.start()], has_comment)
+                return match.end()
+        elif c == '#':
+            has_comment = True
+        elif depth != 1 or c == '"' or c == "'":
+            continue
+        elif c == ',':
+            if key is not None:
+                _set_attribute(entry, key, text[start:match.start()], has_comment)
+                key = None
+        elif match.lastindex == 2:
+            entry[match.group(1)] = match.group(2)
+        else:
+            key = match.group(3)
+            start = match.end()
+            has_comment = False
+    return None
 
 
 def loads(text):
-    lines = text.split('\n')
-
+    # Lines are matched by the leading `\n`, including the first one.
+    text = '\n' + text
     result = []
-    entry = {}
-    for line in lines:
-        if match := RULE.match(line):
-            entry['rule'] = match.group(1)
+    entry = None
+    indent = None
+    pos = 0
+    while match := LINE.search(text, pos):
+        pos = match.end()
+        group = match.lastindex
+        if group == 3:
+            if match.group(1):
+                # Nested call.
+                continue
+            rule = match.group(2)
+            entry = {'rule': rule}
+            rest = match.group(3).strip()
+            if rule in SKIPPED_CALLS and rest.endswith(')') and rest.count('(') + 1 == rest.count(')'):
+                # Skip single line calls, eg. `load(...)`, without tokenizing them.
+                entry = None
+                continue
+            if rest and not rest.startswith('#'):
+                # Arguments start on the same line, parse the whole call.
+                pos = _parse_call(text, match.end(2) + 1, entry)
+                if pos is None:
+                    break
+                if rule not in SKIPPED_CALLS:
+                    result.append(entry)
+                entry = None
+                continue
+            # Top level arguments are on the lines with the same indentation.
+            indent = INDENT.match(text, pos + 1).group()
+        elif group == 1:
+            # End of top level call.
+            if entry is not None and not match.group(1):
+                if entry['rule'] not in SKIPPED_CALLS:
+                    result.append(entry)
+                entry = None
+        elif entry is None or match.group(1) != indent:
+            # Not inside a call or nested deeper than top level arguments.
             continue
+        elif group == 5:
+            entry[match.group(4)] = match.group(5)
+        elif group == 6:
+            entry['srcs'] = match.group(6)
+        else:
+            value, pos, has_comment = _read_value(text, pos)
+            _set_attribute(entry, match.group(7), value, has_comment)
+    return result
 
-        if match := NAME.match(line):
-            entry['name'] = match.group(1)
-            continue
 
-        if match := SRCS_GLOB.match(line):
-            entry['srcs'] = match.group(1)
-            continue
+BIN_OR_LIB_RULES = ['rust_library', 'rust_binary', 'rust_proc_macro', 'rust_canister']
+TESTED_CRATE_RULES = ['rust_library', 'rust_binary', 'rust_proc_macro']
+TEST_RULES = ['rust_test', 'rust_test_suite']
+
+
+def crate_names(package_name):
+    return [package_name, package_name.replace('-', '_')]
+
+
+class BazelFile:
+    def __init__(self, rules):
+        self.rules = rules
+        # Rules by kind, eg. `rust_library`.
+        self.by_kind = {}
+        # Rules by `name` and by `crate_name`.
+        self.by_name = {}
+        # Test crate labels without `:`, eg. `der_utils` for `:der_utils`.
+        self.test_crates = set()
+        # Whether there are tests without a crate, built from `test(s)/` sources.
+        self.has_source_tests = False
+        for rule in rules:
+            self.by_kind.setdefault(rule.get('rule'), []).append(rule)
+            for key in ['name', 'crate_name']:
+                if (name := rule.get(key)) is not None:
+                    self.by_name.setdefault(name, []).append(rule)
+            if rule.get('rule') in TEST_RULES:
+                test_crate = rule.get('crate')
+                if test_crate is None:
+                    srcs = rule.get('srcs', '')
+                    if 'tests/' in srcs or 'test/' in srcs:
+                        self.has_source_tests = True
+                else:
+                    self.test_crates.add(test_crate.replace(':', ''))
+
+    def find(self, rule_types, name):
+        for rule in self.by_name.get(name, []):
+            if rule.get('rule') in rule_types:
+                return rule
+        return None
+
+    def has_rule(self, rule_types, name):
+        if self.find(rule_types, name) is not None:
+            return True
+        # Cargo target name may be only a part of Bazel rule name.
+        for rule_type in rule_types:
+            for rule in self.by_kind.get(rule_type, []):
+                if name in rule.get('name', '') or name in rule.get('crate_name', ''):
+                    return True
+        return False
 
-        if match := SRCS_NO_GLOB.match(line):
-            entry['srcs'] = match.group(1)
-            continue
 
-        if match := CRATE_NAME.match(line):
-            entry['crate_name'] = match.group(1)
-            continue
+def index(data):
+    if isinstance(data, BazelFile):
+        return data
+    return BazelFile(data)
 
-        if match := CRATE.match(line):
-            entry['crate'] = match.group(1)
-            continue
 
-        if line == ')':
-            if entry.get('rule'):
-                result.append(entry)
-
-            entry = {}
-            continue
-
-    return result
+def load_indexed(text):
+    return BazelFile(loads(text))
 
 
 def is_bazelized_bin_or_lib(package_name, data):
-    def _check(name, data):
-        binaries_or_libs = [
-            x for x in data if x.get('rule') in ['rust_library', 'rust_binary', 'rust_proc_macro', 'rust_canister']
-        ]
-        for x in binaries_or_libs:
-            if name in [x.get('name'), x.get('crate_name')]:
-                return True
-        return False
-
-    crate_name = package_name.replace('-', '_')
-    return _check(package_name, data) or _check(crate_name, data)
+    data = index(data)
+    return any(data.find(BIN_OR_LIB_RULES, x) is not None for x in crate_names(package_name))
 
 
 def is_bazelized_test(package_name, data):
-    def _check(name, data):
-        binaries_or_libs = [
-            x for x in data if x.get('rule') in ['rust_library', 'rust_binary', 'rust_proc_macro']
-        ]
-        tests_or_suites = [
-            x for x in data if x.get('rule') in ['rust_test', 'rust_test_suite']
-        ]
-        for test in tests_or_suites:
-            test_crate = test.get('crate')
-            if test_crate is None:
-                if 'tests/' in test.get('srcs', ''):
-                    return True
-                if 'test/' in test.get('srcs', ''):
-                    return True
-                continue
-
-            test_crate = test_crate.replace(':', '')
-            for bin in binaries_or_libs:
-                if test_crate == bin.get('name') and name in [bin.get('name'), bin.get('crate_name')]:
-                    return True
-
-        return False
-
-    crate_name = package_name.replace('-', '_')
-    return _check(package_name, data) or _check(crate_name, data)
+    data = index(data)
+    if data.has_source_tests:
+        return True
+    for name in crate_names(package_name):
+        for rule in data.by_name.get(name, []):
+            if rule.get('rule') in TESTED_CRATE_RULES and rule.get('name') in data.test_crates:
+                return True
+    return False
@@ -83,6 +83,7 @@ rust_canister(
             {
                 'rule': 'filegroup',
                 'name': 'sources',
+                'srcs': 'glob(["**"], exclude = ["target/**"])',
             },
             {
                 'rule': 'rust_binary',
@@ -123,6 +124,46 @@ rust_canister(
             }
         ])
 
+    def test_loads_multiline(self):
+        text = '''
+load(
+    "@rules_rust//rust:defs.bzl",
+    "rust_test",
+)
+
+package(default_visibility = ["//visibility:public"])
+
+exports_files(
+    ["Cargo.toml"],
+)
+
+rust_test(name = "inline_test", crate = ":inline")
+
+rust_test_suite(
+    name = "suite",  # name = "commented",
+    srcs = glob(
+        [
+            "tests/**/*.rs",  # ) unbalanced in a comment
+        ],
+        exclude = ["tests/(skipped).rs"],
+    ) + ["extra.rs"],
+    env = {"name": "not an attribute"},
+    crate_name = NOT_A_STRING,
+)
+'''
+        self.assertEqual(bazel.loads(text), [
+            {
+                'rule': 'rust_test',
+                'name': 'inline_test',
+                'crate': ':inline',
+            },
+            {
+                'rule': 'rust_test_suite',
+                'name': 'suite',
+                'srcs': 'glob(["tests/**/*.rs"], exclude = ["tests/(skipped).rs"]) + ["extra.rs"]',
+            },
+        ])
+
     def test_is_bazelized_bin_or_lib_name(self):
         crate = 'phantom_newtype'
         data = bazel.loads('''
@@ -212,6 +253,24 @@ rust_test(
         self.assertTrue(bazel.is_bazelized_bin_or_lib(crate, data))
         self.assertTrue(bazel.is_bazelized_test(crate, data))
 
+    def test_load_indexed(self):
+        data = bazel.load_indexed('''
+rust_library(
+    name = "der_utils",
+    crate_name = "ic_crypto_internal_threshold_sig_bls12381_der",
+)
+
+rust_binary(
+    name = "log_analyzer_bench",
+)
+''')
+        self.assertEqual(len(data.rules), 2)
+        self.assertEqual(data.find(['rust_library'], 'der_utils'), data.rules[0])
+        self.assertIsNone(data.find(['rust_binary'], 'der_utils'))
+        self.assertTrue(data.has_rule(['rust_library'], 'ic_crypto_internal_threshold_sig_bls12381_der'))
+        self.assertTrue(data.has_rule(['rust_binary'], 'log_analyzer'))
+        self.assertFalse(data.has_rule(['rust_binary'], 'sha'))
+
 
 if __name__ == '__main__':
     unittest.main()
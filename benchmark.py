@@ -0,0 +1,223 @@
+#!/usr/bin/python3
+import io
+import os
+import json
+import time
+import toml
+import cargo
+import bazel
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+import contextlib
+import main
+from main import FAKE_ROOT, RED, YELLOW
+from walk import find_packages
+
+
+STAGES = [
+    'walk',
+    'toml.loads',
+    'cargo.loads',
+    'bazel.loads',
+    'build_graph',
+    'extract_subtree',
+    'add_height',
+    'write_csv',
+    'to_graphviz',
+]
+
+
+def crate_name(i):
+    return f'bench-crate-{i}'
+
+
+def write_file(path, lines):
+    with open(path, 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+
+
+def cargo_toml(package_name, dependencies, dev_dependencies, bins, benches):
+    lines = ['[package]', f'name = "{package_name}"', 'version = "0.1.0"', 'edition = "2021"', '']
+    lines += ['[dependencies]'] + [f'{x} = {{ path = "../{x}" }}' for x in dependencies]
+    lines += ['serde = { version = "1.0", features = ["derive"] }', '']
+    if dev_dependencies:
+        lines += ['[dev-dependencies]'] + [f'{x} = {{ path = "../{x}" }}' for x in dev_dependencies] + ['']
+    lines += ['[lib]', f'name = "{package_name.replace("-", "_")}"', 'path = "src/lib.rs"', '']
+    for i in range(bins):
+        lines += ['[[bin]]', f'name = "{package_name}-bin-{i}"', f'path = "src/bin/main_{i}.rs"', '']
+    for i in range(benches):
+        lines += ['[[bench]]', f'name = "{package_name}-bench-{i}"', 'harness = false', '']
+    return lines
+
+
+def build_bazel(package_name, dependencies, has_tests, bins, benches):
+    crate = package_name.replace('-', '_')
+    deps = [f'        "//rs/{x}",' for x in dependencies] + ['        "@crate_index//:serde",']
+    lines = ['load("@rules_rust//rust:defs.bzl", "rust_binary", "rust_library", "rust_test")', '',
+             'package(default_visibility = ["//visibility:public"])', '']
+    lines += ['rust_library(', '    name = "lib",', '    srcs = glob(["src/**/*.rs"]),',
+              f'    crate_name = "{crate}",', '    deps = ['] + deps + ['    ],', ')', '']
+    if has_tests:
+        lines += ['rust_test(', '    name = "lib_test",', '    crate = ":lib",', ')', '']
+    for i in range(bins):
+        lines += ['rust_binary(', f'    name = "{package_name}-bin-{i}",', f'    srcs = ["src/bin/main_{i}.rs"],',
+                  '    deps = [":lib"],', ')', '']
+    for i in range(benches):
+        lines += ['rust_binary(', f'    name = "{package_name}-bench-{i}",', f'    srcs = ["benches/bench_{i}.rs"],',
+                  '    deps = [":lib"],', ')', '']
+    return lines
+
+
+def generate_workspace(root, crates=1000, fan_out=4, diamond_depth=10, dev_ratio=0.5, bazel_coverage=0.6,
+                       bins=1, benches=1, groups=20, seed=1):
+    # Writes `<root>/rs/...` with `crates` packages, every package depends on
+    # up to `fan_out` later packages (no cycles), the first package depends on
+    # a chain of `diamond_depth` diamonds. Returns the source directory.
+    rng = random.Random(seed)
+    source_dir = os.path.join(root, 'rs')
+    names = [crate_name(i) for i in range(crates)]
+    diamonds = []
+    for i in range(diamond_depth):
+        diamonds += [f'diamond-top-{i}', f'diamond-left-{i}', f'diamond-right-{i}']
+    packages = {}
+    for i, package_name in enumerate(names):
+        later = names[i + 1:]
+        dependencies = rng.sample(later, min(len(later), rng.randint(0, fan_out)))
+        dev_dependencies = []
+        if rng.random() < dev_ratio:
+            dev_dependencies = rng.sample(later, min(len(later), rng.randint(1, max(1, fan_out // 2))))
+        packages[package_name] = (dependencies, dev_dependencies)
+    if diamonds and names:
+        packages[names[0]][0].append(diamonds[0])
+    for i in range(diamond_depth):
+        bottom = [f'diamond-top-{i + 1}'] if i + 1 < diamond_depth else []
+        packages[f'diamond-top-{i}'] = ([f'diamond-left-{i}', f'diamond-right-{i}'], [])
+        packages[f'diamond-left-{i}'] = (bottom, [])
+        packages[f'diamond-right-{i}'] = (bottom, [])
+
+    for i, (package_name, (dependencies, dev_dependencies)) in enumerate(packages.items()):
+        directory = os.path.join(source_dir, f'group_{i % groups}', package_name)
+        os.makedirs(directory, exist_ok=True)
+        write_file(os.path.join(directory, 'Cargo.toml'),
+                   cargo_toml(package_name, dependencies, dev_dependencies, bins, benches))
+        if rng.random() < bazel_coverage:
+            write_file(os.path.join(directory, 'BUILD.bazel'),
+                       build_bazel(package_name, dependencies, bool(dev_dependencies), bins, benches))
+    write_file(os.path.join(source_dir, 'Cargo.toml'), ['[workspace]', 'members = []'])
+    os.makedirs(os.path.join(source_dir, 'target', 'debug'), exist_ok=True)
+    return source_dir
+
+
+def measure(function, repeat):
+    # Returns the result of the last run and its timings in seconds.
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - start)
+    timing = {
+        'min': min(times),
+        'mean': sum(times) / len(times),
+        'max': max(times),
+        'runs': len(times),
+    }
+    return result, timing
+
+
+def scans(text):
+    try:
+        cargo.scan(text)
+    except cargo.Unsupported:
+        return False
+    return True
+
+
+def run_benchmark(source_dir, repeat=3, output_dir=None):
+    stages = {}
+    paths, stages['walk'] = measure(lambda: list(find_packages(source_dir)), repeat)
+    cargo_texts = [main.read(x) for x, _ in paths]
+    bazel_texts = [main.read(x) for _, x in paths if x is not None]
+    _, stages['toml.loads'] = measure(lambda: [toml.loads(x) for x in cargo_texts], repeat)
+    _, stages['cargo.loads'] = measure(lambda: [cargo.loads(x) for x in cargo_texts], repeat)
+    _, stages['bazel.loads'] = measure(lambda: [bazel.loads(x) for x in bazel_texts], repeat)
+    graph, stages['build_graph'] = measure(lambda: main.build_graph(
+        source_dir, skip_3rd_party=True, dev_dependencies=True, count_missing=True, force_migrated=[]), repeat)
+    subtree, stages['extract_subtree'] = measure(lambda: main.extract_subtree(graph, None), repeat)
+    _, stages['add_height'] = measure(lambda: main.add_height(subtree, FAKE_ROOT), repeat)
+    main.add_height_color(subtree, RED, YELLOW)
+    main.add_parent_count(subtree)
+    csv_path = os.path.join(output_dir or tempfile.gettempdir(), 'benchmark.csv')
+    _, stages['write_csv'] = measure(lambda: main.write_csv(subtree, csv_path), repeat)
+    with contextlib.redirect_stdout(io.StringIO()):
+        _, stages['to_graphviz'] = measure(lambda: main.to_graphviz(subtree).source, repeat)
+
+    counts = {
+        'packages': len(paths),
+        'build_files': len(bazel_texts),
+        'bytes': sum(len(x) for x in cargo_texts + bazel_texts),
+        'cargo scan fallbacks': sum(1 for x in cargo_texts if not scans(x)),
+        'nodes': len(graph),
+        'edges': sum(len(graph[x].get('children', [])) for x in graph),
+    }
+    return {'counts': counts, 'stages': stages}
+
+
+def run():
+    # Parse agruments.
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '-sd', '--source_dir', help='benchmark an existing source directory instead of a generated one', default=None)
+    parser.add_argument(
+        '-wd', '--workspace_dir', help='directory for the generated workspace, temporary if empty', default=None)
+    parser.add_argument('-c', '--crates', help='number of crates', type=int, default=1000)
+    parser.add_argument('-fo', '--fan_out', help='max dependencies per crate', type=int, default=4)
+    parser.add_argument('-dd', '--diamond_depth', help='length of the diamond chain', type=int, default=10)
+    parser.add_argument('-dr', '--dev_ratio', help='share of crates with dev-dependencies', type=float, default=0.5)
+    parser.add_argument('-bc', '--bazel_coverage', help='share of crates with BUILD.bazel', type=float, default=0.6)
+    parser.add_argument('-b', '--bins', help='binaries per crate', type=int, default=1)
+    parser.add_argument('-be', '--benches', help='benches per crate', type=int, default=1)
+    parser.add_argument('-s', '--seed', help='random seed', type=int, default=1)
+    parser.add_argument('-r', '--repeat', help='runs per stage', type=int, default=3)
+    parser.add_argument(
+        '-o', '--output', help='JSON results file', default='./output/benchmark.json')
+    args = parser.parse_args()
+
+    config = {x: getattr(args, x) for x in [
+        'crates', 'fan_out', 'diamond_depth', 'dev_ratio', 'bazel_coverage', 'bins', 'benches', 'seed', 'repeat']}
+    workspace_dir = None
+    source_dir = args.source_dir
+    if source_dir is None:
+        workspace_dir = args.workspace_dir or tempfile.mkdtemp(prefix='cargo-to-bazel-bench-')
+        source_dir = generate_workspace(
+            workspace_dir, args.crates, args.fan_out, args.diamond_depth, args.dev_ratio, args.bazel_coverage,
+            args.bins, args.benches, seed=args.seed)
+    else:
+        config = {'source_dir': source_dir, 'repeat': args.repeat}
+
+    try:
+        result = run_benchmark(source_dir, args.repeat, os.path.dirname(args.output) or None)
+    finally:
+        # Remove temporary workspace only.
+        if workspace_dir is not None and args.workspace_dir is None:
+            shutil.rmtree(workspace_dir)
+    result = {'config': config, 'python': platform.python_version(), **result}
+
+    directory = os.path.dirname(args.output)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(result, f, indent=2)
+
+    print(f'Packages / nodes / edges: {result["counts"]["packages"]} / '
+          f'{result["counts"]["nodes"]} / {result["counts"]["edges"]}')
+    for stage in STAGES:
+        timing = result['stages'][stage]
+        print(f'{stage:<16} min {1000*timing["min"]:>9.02f} ms, mean {1000*timing["mean"]:>9.02f} ms')
+    print(f'Results: {args.output}')
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,33 @@
+import shutil
+import tempfile
+import unittest
+import main
+import benchmark
+
+
+class TestBenchmark(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_generate_workspace(self):
+        source_dir = benchmark.generate_workspace(self.root, crates=30, diamond_depth=3, dev_ratio=0, bazel_coverage=1)
+        graph = main.build_graph(source_dir, skip_3rd_party=True, dev_dependencies=True,
+                                 count_missing=True, force_migrated=[])
+        self.assertEqual(len(graph), 30 + 3 * 3)
+        self.assertIn('diamond-top-0', graph['bench-crate-0']['children'])
+        self.assertTrue(all(graph[x]['bazelized'] for x in graph))
+        self.assertTrue(all(graph[x]['missing bin'] == 0 for x in graph))
+
+    def test_run_benchmark(self):
+        source_dir = benchmark.generate_workspace(self.root, crates=20, diamond_depth=2)
+        result = benchmark.run_benchmark(source_dir, repeat=1, output_dir=self.root)
+        self.assertEqual(list(result['stages']), benchmark.STAGES)
+        self.assertEqual(result['counts']['packages'], 20 + 2 * 3 + 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+#!/usr/bin/python3
+import os
+import json
+import hashlib
+
+
+# Bump when the format of cached parse results changes.
+CACHE_VERSION = 3
+DEFAULT_MAX_ENTRIES = 20000
+
+
+def digest(data):
+    return hashlib.sha1(data).hexdigest()
+
+
+class ParseCache:
+    def __init__(self, path, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        self.is_dirty = False
+
+    def load(self):
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return self
+        if data.get('version') == CACHE_VERSION:
+            self.entries = data.get('entries', {})
+        return self
+
+    def save(self):
+        # Cache without a path is kept in memory only.
+        if not self.is_dirty or not self.path:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Write to a temporary file first, so an interrupted run never leaves
+        # a truncated cache behind.
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'version': CACHE_VERSION, 'entries': self.entries}, f)
+        os.replace(tmp_path, self.path)
+        self.is_dirty = False
+
+    def _touch(self, key, entry):
+        # Move entry to the end, entries are kept in least recently used order.
+        self.entries.pop(key, None)
+        self.entries[key] = entry
+
+    def _evict(self):
+        while len(self.entries) > self.max_entries:
+            del self.entries[next(iter(self.entries))]
+
+    def lookup(self, path):
+        key = str(path)
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        stat = os.stat(path)
+        if entry['mtime'] != stat.st_mtime_ns or entry['size'] != stat.st_size:
+            # File was touched, compare content before giving up.
+            with open(path, 'rb') as f:
+                data = f.read()
+            if entry['size'] != len(data) or entry['sha1'] != digest(data):
+                self.misses += 1
+                return None
+            entry['mtime'] = stat.st_mtime_ns
+            entry['size'] = stat.st_size
+        self.hits += 1
+        self._touch(key, entry)
+        self.is_dirty = True
+        return entry['value']
+
+    def store(self, path, value, sha1=None):
+        if sha1 is None:
+            with open(path, 'rb') as f:
+                sha1 = digest(f.read())
+        stat = os.stat(path)
+        self._touch(str(path), {
+            'mtime': stat.st_mtime_ns,
+            'size': stat.st_size,
+            'sha1': sha1,
+            'value': value,
+        })
+        self._evict()
+        self.is_dirty = True
+
+    def get(self, path, parse):
+        value = self.lookup(path)
+        if value is None:
+            with open(path, 'rb') as f:
+                data = f.read()
+            value = parse(data.decode())
+            self.store(path, value, digest(data))
+        return value
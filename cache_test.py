@@ -0,0 +1,73 @@
+import os
+import json
+import shutil
+import tempfile
+import unittest
+from cache import ParseCache, CACHE_VERSION
+
+
+class TestParseCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def write(self, name, text):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w') as f:
+            f.write(text)
+        return path
+
+    def test_lookup(self):
+        cache = ParseCache(None)
+        path = self.write('Cargo.toml', 'a')
+        self.assertIsNone(cache.lookup(path))
+        cache.store(path, {'name': 'a'})
+        self.assertEqual(cache.lookup(path), {'name': 'a'})
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_changed_content(self):
+        cache = ParseCache(None)
+        path = self.write('Cargo.toml', 'a')
+        cache.store(path, {'name': 'a'})
+        self.write('Cargo.toml', 'bb')
+        self.assertIsNone(cache.lookup(path))
+
+    def test_touched_file(self):
+        # Same content with a new mtime is revalidated by the hash.
+        cache = ParseCache(None)
+        path = self.write('Cargo.toml', 'a')
+        cache.store(path, {'name': 'a'})
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        self.assertEqual(cache.lookup(path), {'name': 'a'})
+        self.assertEqual(cache.entries[path]['mtime'], stat.st_mtime_ns + 10**9)
+
+    def test_eviction(self):
+        cache = ParseCache(None, max_entries=2)
+        paths = [self.write(f'{x}.toml', x) for x in 'abc']
+        cache.store(paths[0], 'a')
+        cache.store(paths[1], 'b')
+        # Lookup makes `a` the most recently used entry.
+        cache.lookup(paths[0])
+        cache.store(paths[2], 'c')
+        self.assertEqual(list(cache.entries), [paths[0], paths[2]])
+
+    def test_save_load(self):
+        cache_path = os.path.join(self.directory, 'cache', 'parse_cache.json')
+        path = self.write('Cargo.toml', 'a')
+        cache = ParseCache(cache_path)
+        cache.store(path, {'name': 'a'})
+        cache.save()
+        self.assertEqual(ParseCache(cache_path).load().lookup(path), {'name': 'a'})
+
+    def test_version_mismatch(self):
+        cache_path = self.write('parse_cache.json', json.dumps({
+            'version': CACHE_VERSION - 1,
+            'entries': {'Cargo.toml': {'mtime': 0, 'size': 0, 'sha1': '', 'value': 'a'}},
+        }))
+        self.assertEqual(ParseCache(cache_path).load().entries, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
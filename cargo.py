@@ -0,0 +1,137 @@
+#!/usr/bin/python3
+import re
+
+
+# Tables `build_graph` reads, everything else is skipped.
+SCANNED_TABLES = ['package', 'dependencies', 'dev-dependencies', 'lib', 'bin', 'bench']
+STRING = re.compile(r'"(?:[^"\\\n]|\\.)*"|\'[^\'\n]*\'')
+HEADER = re.compile(r'\[(\[)?\s*([A-Za-z0-9_\-]+)\s*(?:\.\s*([A-Za-z0-9_\-]+|"[^"\\]*"))?\s*(\.)?[^\]]*\](\])?$')
+KEY = re.compile(r'\s*([A-Za-z0-9_\-]+|"[^"\\]*"|\'[^\']*\')\s*(\.|=)')
+SIMPLE_STRING = re.compile(r'"([^"\\]*)"|\'([^\']*)\'')
+
+
+class Unsupported(ValueError):
+    # Syntax the scanner does not handle, full TOML parser is used instead.
+    pass
+
+
+def _target(block):
+    return {
+        'name': block.get('name'),
+        'path': block.get('path', ''),
+    }
+
+
+def extract(info):
+    # Keep only the fields `build_graph` reads from a manifest.
+    lib = info.get('lib')
+    return {
+        'name': info.get('package', {}).get('name'),
+        'dependencies': list(info.get('dependencies', {}).keys()),
+        'dev-dependencies': list(info.get('dev-dependencies', {}).keys()),
+        'lib': _target(lib) if lib is not None else None,
+        'bin': [_target(x) for x in info.get('bin', [])],
+        'bench': [_target(x) for x in info.get('bench', [])],
+    }
+
+
+def _unquote(text):
+    if text[0] in '"\'':
+        return text[1:-1]
+    return text
+
+
+def _string(value):
+    # Plain string without escapes, optionally followed by a comment.
+    value = value.strip()
+    match = SIMPLE_STRING.match(value)
+    if match is None or value[match.end():].strip()[:1] not in ['', '#']:
+        raise Unsupported(f'Unsupported value: {value}')
+    return match.group(1) if match.group(1) is not None else match.group(2)
+
+
+def scan(text):
+    # Line based scanner of the fields `extract` keeps, the document is never
+    # built. Raises `Unsupported` on syntax it does not handle.
+    info = {}
+    table = None
+    is_root = True
+    depth = 0
+    for line in text.split('\n'):
+        if '"""' in line or "'''" in line:
+            raise Unsupported('Multi-line strings')
+        # Code without strings and comments, used for brackets balance.
+        code = line
+        if '"' in code or "'" in code:
+            code = STRING.sub('""', code)
+        if '#' in code:
+            code = code.split('#', 1)[0]
+        if depth > 0:
+            # Continuation of a multi-line array.
+            depth += code.count('[') + code.count('{') - code.count(']') - code.count('}')
+            continue
+        stripped = code.strip()
+        if not stripped:
+            continue
+
+        if stripped.startswith('['):
+            header = HEADER.match(line.split('#', 1)[0].strip())
+            if header is None:
+                raise Unsupported(f'Unsupported header: {line}')
+            is_array, name, key, is_dotted, closing = header.groups()
+            if bool(is_array) != bool(closing):
+                raise Unsupported(f'Unsupported header: {line}')
+            table = None
+            is_root = False
+            if name not in SCANNED_TABLES:
+                continue
+            if is_array:
+                if key is not None or name not in ['bin', 'bench']:
+                    raise Unsupported(f'Unsupported header: {line}')
+                table = {}
+                info.setdefault(name, []).append(table)
+            elif key is None:
+                table = info.setdefault(name, {})
+            elif name in ['dependencies', 'dev-dependencies'] and not is_dotted:
+                # `[dependencies.foo]` table.
+                info.setdefault(name, {}).setdefault(_unquote(key), True)
+            elif name != 'package':
+                raise Unsupported(f'Unsupported header: {line}')
+            continue
+
+        match = KEY.match(line)
+        if match is None:
+            raise Unsupported(f'Unsupported line: {line}')
+        key, separator = _unquote(match.group(1)), match.group(2)
+        value = line[match.end():]
+        if separator == '=':
+            value_code = code[code.index('=') + 1:]
+            depth = value_code.count('[') + value_code.count('{') - value_code.count(']') - value_code.count('}')
+        else:
+            depth = code.count('[') + code.count('{') - code.count(']') - code.count('}')
+        if table is None:
+            if is_root and key in SCANNED_TABLES:
+                raise Unsupported(f'Unsupported root key: {line}')
+            continue
+        if table is info.get('dependencies') or table is info.get('dev-dependencies'):
+            table.setdefault(key, True)
+        elif key in ['name', 'path']:
+            if separator != '=':
+                raise Unsupported(f'Unsupported key: {line}')
+            table[key] = _string(value)
+    if depth != 0:
+        raise Unsupported('Unbalanced brackets')
+    return extract(info)
+
+
+def loads(text):
+    try:
+        return scan(text)
+    except Unsupported:
+        return loads_toml(text)
+
+
+def loads_toml(text):
+    # Imported on first use, keeps startup fast.
+    import toml
+    return extract(toml.loads(text))
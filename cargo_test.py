@@ -0,0 +1,83 @@
+#!/usr/bin/python3
+import cargo
+import unittest
+
+
+MANIFEST = '''
+cargo-features = ["edition2021"]  # root key
+
+[package]
+name = "ic-types" # comment with "quotes" and [brackets]
+version.workspace = true
+authors = [
+    "DFINITY [team]",  # ]
+    'x',
+]
+description = "#not a comment"
+
+[package.metadata.docs.rs]
+all-features = true
+
+[lib]
+name = 'ic_types'
+path = "src/lib.rs"
+
+[[bin]]
+name = "tool"
+path = "src/main.rs"
+
+[[bin]]
+name = "test-tool"
+path = "test/main.rs"
+required-features = ["a", "b"]
+
+[[bench]]
+name = "bench"
+harness = false
+
+[dependencies]
+candid = { workspace = true }
+"quoted-dep" = "1.0"
+dotted.workspace = true
+serde = { version = "1.0", features = [
+    "derive",
+] }
+
+[dependencies.ic-base-types]
+path = "../types/base_types"
+
+[target.'cfg(target_os = "linux")'.dependencies]
+nix = "0.23"
+
+[dev-dependencies]
+proptest = "1.0"
+
+[features]
+default = []
+'''
+
+
+class TestCargo(unittest.TestCase):
+
+    def test_scan(self):
+        expected = cargo.loads_toml(MANIFEST)
+        self.assertEqual(cargo.scan(MANIFEST), expected)
+        self.assertEqual(expected['name'], 'ic-types')
+        self.assertEqual(expected['dependencies'], ['candid', 'quoted-dep', 'dotted', 'serde', 'ic-base-types'])
+        self.assertEqual(expected['bench'], [{'name': 'bench', 'path': ''}])
+
+    def test_fallback(self):
+        manifests = [
+            '[package]\nname = "a"\ndescription = """\n[dependencies]\nb = 1\n"""\n',
+            'package.name = "a"\n',
+            '[package]\nname = "a\\u0062"\n',
+            '[[package.metadata.x]]\ny = 1\n',
+        ]
+        for text in manifests:
+            with self.assertRaises(cargo.Unsupported):
+                cargo.scan(text)
+            self.assertEqual(cargo.loads(text), cargo.loads_toml(text))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+#!/usr/bin/python3
+import argparse
+
+
+# Helpers shared by `main.py` and the modules it imports, they must not
+# import `main` (it is loaded twice when run as a script).
+FAKE_ROOT = 'fake-root'
+ALL_PACKAGES_KEYWORDS = [
+    'None',
+    'none',
+    'default',
+    '.',
+    'all',
+    '',
+]
+
+
+def read(path):
+    with open(path, 'r') as f:
+        return f.read()
+
+
+def str2bool(v):
+    if isinstance(v, bool):
+        return v
+    if v.lower() in ('yes', 'true', 't', 'y', '1'):
+        return True
+    elif v.lower() in ('no', 'false', 'f', 'n', '0'):
+        return False
+    else:
+        raise argparse.ArgumentTypeError('Boolean value expected.')
+
+
+def dev_name(name):
+    return f'{name}-[dev]'
+
+
+def report_name(root_package, dev_dependencies):
+    dev = '-dev' if dev_dependencies else ''
+    return f'{root_package}{dev}'
+
+
+def node_label(package_name, info):
+    # Returns node text and fill color.
+    node_text = f'{package_name}'
+    fillcolor = 'grey'  # default
+
+    # Display height.
+    height = info.get('height')
+    if height is not None:
+        node_text += f'\nheight:{height}'
+
+    # Display parent count.
+    parents = info.get('parent_count')
+    if parents is not None:
+        node_text += f'\nparents:{parents}'
+
+    # Display bazel status and color.
+    if info.get('bazelized'):
+        node_text += f'\nbazel:yes'
+        fillcolor = 'green'
+
+    # Display not converted node color.
+    color = info.get('color')
+    if color is not None:
+        # node_text += f'\ncolor:{color}'
+        fillcolor = color
+    return node_text, fillcolor
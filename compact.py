@@ -0,0 +1,274 @@
+#!/usr/bin/python3
+from array import array
+from collections.abc import Mapping, MutableMapping
+
+
+# Per-node integer attributes, -1 means the attribute is not set.
+INT_FIELDS = [
+    'height',
+    'parent_count',
+    'missing bin',
+    'missing lib',
+    'missing bench',
+]
+# Per-node boolean attributes, always set.
+BOOL_FIELDS = [
+    'bazelized',
+    'force_migrated',
+]
+
+
+class Node(MutableMapping):
+    # Lightweight view of a single node, reads and writes graph arrays.
+    __slots__ = ('graph', 'id')
+
+    def __init__(self, graph, id):
+        self.graph = graph
+        self.id = id
+
+    def __getitem__(self, key):
+        graph = self.graph
+        if key == 'children':
+            return graph.children_names(self.id)
+        if key in graph.ints:
+            value = graph.ints[key][self.id]
+            if value < 0:
+                raise KeyError(key)
+            return value
+        if key in graph.bools:
+            return bool(graph.bools[key][self.id])
+        if key == 'color':
+            value = graph.colors[self.id]
+            if value is None:
+                raise KeyError(key)
+            return value
+        return graph.extra[self.id][key]
+
+    def __setitem__(self, key, value):
+        graph = self.graph
+        if key in graph.ints:
+            graph.ints[key][self.id] = value
+        elif key in graph.bools:
+            graph.bools[key][self.id] = bool(value)
+        elif key == 'color':
+            graph.colors[self.id] = value
+        elif key == 'children':
+            raise KeyError('Children of a compact graph are read-only')
+        else:
+            graph.extra.setdefault(self.id, {})[key] = value
+
+    def __delitem__(self, key):
+        graph = self.graph
+        if key in graph.ints:
+            graph.ints[key][self.id] = -1
+        elif key == 'color':
+            graph.colors[self.id] = None
+        else:
+            del graph.extra[self.id][key]
+
+    def __iter__(self):
+        yield 'children'
+        for key in self.graph.bools:
+            yield key
+        for key, values in self.graph.ints.items():
+            if values[self.id] >= 0:
+                yield key
+        if self.graph.colors[self.id] is not None:
+            yield 'color'
+        yield from self.graph.extra.get(self.id, {})
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+
+class CompactGraph(Mapping):
+    # Package names are interned to integer ids, adjacency is stored in
+    # CSR arrays: children of node `i` are `targets[offsets[i]:offsets[i+1]]`.
+    # Ids `>= size` are children that are not nodes (eg. 3rd party packages).
+
+    def __init__(self, names, size, offsets, targets):
+        self.names = names
+        self.size = size
+        self.ids = {x: i for i, x in enumerate(names)}
+        self.offsets = offsets
+        self.targets = targets
+        self.ints = {x: array('i', [-1]) * size for x in INT_FIELDS}
+        self.bools = {x: bytearray(size) for x in BOOL_FIELDS}
+        self.colors = [None] * size
+        self.extra = {}
+
+    @classmethod
+    def from_graph(cls, graph):
+        names = list(graph)
+        size = len(names)
+        ids = {x: i for i, x in enumerate(names)}
+        offsets = array('i', [0])
+        targets = array('i')
+        for package_name in names[:size]:
+            for child in graph[package_name].get('children', []):
+                if child not in ids:
+                    ids[child] = len(names)
+                    names.append(child)
+                targets.append(ids[child])
+            offsets.append(len(targets))
+        result = cls(names, size, offsets, targets)
+        for i, package_name in enumerate(names[:size]):
+            node = result.node(i)
+            for key, value in graph[package_name].items():
+                if key != 'children' and value is not None:
+                    node[key] = value
+        return result
+
+    def node(self, id):
+        return Node(self, id)
+
+    def children(self, id):
+        return self.targets[self.offsets[id]:self.offsets[id + 1]]
+
+    def children_names(self, id):
+        return [self.names[x] for x in self.children(id)]
+
+    def edges_count(self):
+        return len(self.targets)
+
+    def __getitem__(self, package_name):
+        id = self.ids.get(package_name)
+        if id is None or id >= self.size:
+            raise KeyError(package_name)
+        return Node(self, id)
+
+    def __contains__(self, package_name):
+        id = self.ids.get(package_name)
+        return id is not None and id < self.size
+
+    def __iter__(self):
+        return iter(self.names[:self.size])
+
+    def __len__(self):
+        return self.size
+
+    def parent_counts(self, skip=None):
+        counts = array('i', [0]) * len(self.names)
+        targets = self.targets
+        if skip is not None:
+            # Skipped node children are not counted.
+            targets = targets[:self.offsets[skip]] + targets[self.offsets[skip + 1]:]
+        for child in targets:
+            counts[child] += 1
+        return counts
+
+    def roots(self):
+        counts = self.parent_counts()
+        return [x for x in range(self.size) if counts[x] == 0]
+
+    def descendants(self, start):
+        # Iterative depth-first search, returns a bytearray of visited nodes.
+        # Raises ValueError with the cycle path if a cycle is reachable.
+        SEARCHING, FOUND = 1, 2
+        status = bytearray(len(self.names))
+        path = []
+        stack = [(start, 0)]
+        while stack:
+            id, index = stack.pop()
+            if index == 0:
+                if status[id] == FOUND:
+                    continue
+                if status[id] == SEARCHING:
+                    cycle = [self.names[x] for x in path] + [self.names[id]]
+                    raise ValueError(f'Unexpected graph cycle, see path: {cycle}')
+                status[id] = SEARCHING
+                path.append(id)
+            children = self.children(id) if id < self.size else ()
+            if index < len(children):
+                stack.append((id, index + 1))
+                stack.append((children[index], 0))
+            else:
+                status[id] = FOUND
+                path.pop()
+        return status
+
+    def subgraph(self, keep, fake_root, fake_root_children):
+        # New graph with `keep` nodes in the same order, plus a fake root.
+        ids = [x for x in range(self.size) if keep[x]]
+        names = [self.names[x] for x in ids] + [fake_root]
+        size = len(names)
+        # Old id to new id, ids of children outside of `keep` are appended.
+        remap = array('i', [-1]) * len(self.names)
+        for i, id in enumerate(ids):
+            remap[id] = i
+
+        def new_id(id):
+            if remap[id] < 0:
+                remap[id] = len(names)
+                names.append(self.names[id])
+            return remap[id]
+
+        offsets = array('i', [0])
+        targets = array('i')
+        for id in ids:
+            for k in range(self.offsets[id], self.offsets[id + 1]):
+                child = self.targets[k]
+                targets.append(remap[child] if remap[child] >= 0 else new_id(child))
+            offsets.append(len(targets))
+        for package_name in fake_root_children:
+            id = self.ids.get(package_name)
+            if id is None:
+                targets.append(len(names))
+                names.append(package_name)
+            else:
+                targets.append(new_id(id))
+        offsets.append(len(targets))
+
+        result = CompactGraph(names, size, offsets, targets)
+        for key in self.ints:
+            result.ints[key] = array('i', (self.ints[key][x] for x in ids)) + array('i', [-1])
+        for key in self.bools:
+            result.bools[key] = bytearray(self.bools[key][x] for x in ids) + bytearray(1)
+        result.colors = [self.colors[x] for x in ids] + [None]
+        for i, id in enumerate(ids):
+            if id in self.extra:
+                result.extra[i] = dict(self.extra[id])
+        return result
+
+    def with_fake_root(self, fake_root):
+        # Copy of the graph with a fake root linked to all the roots. Ids of
+        # children that are not nodes are shifted to make room for it.
+        size = self.size
+        names = self.names[:size] + [fake_root] + self.names[size:]
+        roots = self.roots()
+        offsets = self.offsets + array('i', [len(self.targets) + len(roots)])
+        targets = array('i', (x if x < size else x + 1 for x in self.targets)) + array('i', roots)
+        result = CompactGraph(names, size + 1, offsets, targets)
+        for key in self.ints:
+            result.ints[key] = self.ints[key] + array('i', [-1])
+        for key in self.bools:
+            result.bools[key] = self.bools[key] + bytearray(1)
+        result.colors = self.colors + [None]
+        result.extra = {x: dict(y) for x, y in self.extra.items()}
+        return result
+
+    def extract_subtree(self, target_package, fake_root):
+        # Extract target package subtree, all packages if target is None.
+        # The graph itself is not modified.
+        if target_package is None:
+            return self.with_fake_root(fake_root)
+        target = self.ids.get(target_package)
+        if target is None:
+            keep = bytearray(self.size)
+        else:
+            keep = self.descendants(target)
+        return self.subgraph(keep, fake_root, [target_package])
+
+    def add_parent_count(self, skip=None):
+        skip = self.ids.get(skip)
+        counts = self.parent_counts(skip)
+        values = self.ints['parent_count']
+        for id in range(self.size):
+            if id != skip:
+                values[id] = counts[id]
@@ -0,0 +1,211 @@
+#!/usr/bin/python3
+import csv
+import sys
+import time
+import sqlite3
+import argparse
+from common import FAKE_ROOT, ALL_PACKAGES_KEYWORDS, str2bool, report_name
+
+
+# Every report is a run of a scan, packages and edges refer to packages by
+# their id within the run. Packages that are not graph nodes (eg. 3rd party
+# dependencies) are `external` and have no other attributes. BUILD rules
+# belong to the scan and are stored once for all its runs.
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS scans (
+    id INTEGER PRIMARY KEY,
+    created REAL NOT NULL,
+    source_dir TEXT
+);
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    scan_id INTEGER NOT NULL REFERENCES scans (id),
+    created REAL NOT NULL,
+    root TEXT NOT NULL,
+    dev INTEGER NOT NULL,
+    bazel INTEGER NOT NULL,
+    total INTEGER NOT NULL,
+    progress REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS packages (
+    run_id INTEGER NOT NULL REFERENCES runs (id),
+    id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    external INTEGER NOT NULL,
+    bazel INTEGER,
+    forced INTEGER,
+    height INTEGER,
+    parents INTEGER,
+    missing_bin INTEGER,
+    missing_lib INTEGER,
+    missing_bench INTEGER,
+    dependents INTEGER,
+    not_migrated_dependents INTEGER,
+    PRIMARY KEY (run_id, id)
+);
+CREATE TABLE IF NOT EXISTS edges (
+    run_id INTEGER NOT NULL REFERENCES runs (id),
+    parent INTEGER NOT NULL,
+    child INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS bazel_rules (
+    scan_id INTEGER NOT NULL REFERENCES scans (id),
+    crate TEXT NOT NULL,
+    path TEXT NOT NULL,
+    rule TEXT NOT NULL,
+    name TEXT,
+    crate_name TEXT,
+    srcs TEXT
+);
+CREATE INDEX IF NOT EXISTS packages_name ON packages (name, run_id);
+CREATE INDEX IF NOT EXISTS edges_parent ON edges (run_id, parent);
+CREATE INDEX IF NOT EXISTS edges_child ON edges (run_id, child);
+CREATE INDEX IF NOT EXISTS bazel_rules_crate ON bazel_rules (scan_id, crate);
+CREATE INDEX IF NOT EXISTS runs_root ON runs (root, dev);
+'''
+# Not migrated packages reachable from a package, with more than N parents.
+REACHABLE_QUERY = '''
+WITH RECURSIVE reachable (id) AS (
+    SELECT id FROM packages WHERE run_id = :run_id AND name = :name
+    UNION
+    SELECT edges.child FROM edges JOIN reachable ON edges.run_id = :run_id AND edges.parent = reachable.id
+)
+SELECT packages.name, packages.height, packages.parents
+FROM reachable JOIN packages ON packages.run_id = :run_id AND packages.id = reachable.id
+WHERE packages.bazel = 0 AND packages.parents > :min_parents AND packages.name != :name
+ORDER BY packages.height, packages.parents DESC, packages.name
+'''
+
+
+def bazel_rules(data):
+    # Package name to `(BUILD.bazel path, rules)`.
+    rules = {}
+    for entry in data:
+        package_name = entry['cargo_toml']['name']
+        if package_name is not None and entry['bazel_path'] is not None:
+            rules[package_name] = (entry['bazel_path'], entry.get('build_bazel', []))
+    return rules
+
+
+def root_name(root_package):
+    # Whole graph runs are stored as `all`.
+    if str(root_package).strip() in ALL_PACKAGES_KEYWORDS:
+        return 'all'
+    return root_package
+
+
+def flag(value):
+    return None if value is None else int(bool(value))
+
+
+class Database:
+    # Runs are inserted in bulk and kept in one transaction until `commit`.
+    # The scan is inserted with its first run.
+
+    def __init__(self, path, data, source_dir=None):
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(SCHEMA)
+        self.source_dir = source_dir
+        self.update(data)
+
+    def update(self, data):
+        # Called with rescanned packages.
+        self.data = data
+        self.scan_id = None
+
+    def add_scan(self):
+        cursor = self.connection.execute('INSERT INTO scans (created, source_dir) VALUES (?, ?)',
+                                         (time.time(), self.source_dir))
+        scan_id = cursor.lastrowid
+        rows = ((scan_id, crate, path, rule['rule'], rule.get('name'), rule.get('crate_name'), rule.get('srcs'))
+                for crate, (path, rules) in bazel_rules(self.data).items() for rule in rules)
+        self.connection.executemany('INSERT INTO bazel_rules VALUES (?, ?, ?, ?, ?, ?, ?)', rows)
+        return scan_id
+
+    def add_run(self, subtree, root_package, dev_dependencies, progress):
+        # `subtree` is an extracted report subtree with heights, parents and
+        # dependents applied. Returns the run id.
+        if self.scan_id is None:
+            self.scan_id = self.add_scan()
+        bazel_n, total, ratio = progress
+        cursor = self.connection.execute(
+            'INSERT INTO runs (scan_id, created, root, dev, bazel, total, progress) VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (self.scan_id, time.time(), root_name(root_package), int(dev_dependencies), bazel_n, total, ratio))
+        run_id = cursor.lastrowid
+
+        names = [x for x in subtree if x != FAKE_ROOT]
+        ids = {x: i for i, x in enumerate(names)}
+        edges = []
+        for package_name in names:
+            for child in subtree[package_name].get('children', []):
+                if child not in ids:
+                    ids[child] = len(ids)
+                edges.append((run_id, ids[package_name], ids[child]))
+
+        def package_rows():
+            for package_name, id in ids.items():
+                if id >= len(names):
+                    yield (run_id, id, package_name, 1) + (None,) * 9
+                    continue
+                info = subtree[package_name]
+                yield (run_id, id, package_name, 0, flag(info.get('bazelized', False)),
+                       flag(info.get('force_migrated', False)), info.get('height'), info.get('parent_count'),
+                       info.get('missing bin'), info.get('missing lib'), info.get('missing bench'),
+                       info.get('dependents'), info.get('not_migrated_dependents'))
+
+        self.connection.executemany('INSERT INTO packages VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                                    package_rows())
+        self.connection.executemany('INSERT INTO edges VALUES (?, ?, ?)', edges)
+        return run_id
+
+    def commit(self):
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
+
+
+def latest_run(connection, root_package, dev_dependencies):
+    row = connection.execute('SELECT id FROM runs WHERE root = ? AND dev = ? ORDER BY id DESC LIMIT 1',
+                             (root_name(root_package), int(dev_dependencies))).fetchone()
+    if row is None:
+        raise KeyError(report_name(root_package, dev_dependencies))
+    return row[0]
+
+
+def reachable(connection, run_id, package_name, min_parents=0):
+    # Rows of `(name, height, parents)`, see `REACHABLE_QUERY`.
+    return connection.execute(
+        REACHABLE_QUERY, {'run_id': run_id, 'name': package_name, 'min_parents': min_parents}).fetchall()
+
+
+def run():
+    # Parse agruments.
+    parser = argparse.ArgumentParser()
+    parser.add_argument('database_path', help='SQLite database written by `main.py --database_path`')
+    parser.add_argument('-q', '--query', help='SQL query, rows are printed as CSV', default=None)
+    parser.add_argument('-rch', '--reachable',
+                        help='print not migrated packages reachable from the package', default=None)
+    parser.add_argument('-mp', '--min_parents',
+                        help='reachable: keep packages with more parents only', type=int, default=0)
+    parser.add_argument('-rp', '--root_package',
+                        help='reachable: root package of the run', default='all')
+    parser.add_argument('-dev', '--dev_dependencies',
+                        help='reachable: dev-dependencies run', type=str2bool, default=True)
+    args = parser.parse_args()
+
+    connection = sqlite3.connect(args.database_path)
+    writer = csv.writer(sys.stdout)
+    if args.query:
+        cursor = connection.execute(args.query)
+        writer.writerow([x[0] for x in cursor.description])
+        writer.writerows(cursor)
+    if args.reachable:
+        run_id = latest_run(connection, args.root_package, args.dev_dependencies)
+        writer.writerow(['name', 'height', 'parents'])
+        writer.writerows(reachable(connection, run_id, args.reachable, args.min_parents))
+    connection.close()
+
+
+if __name__ == '__main__':
+    run()
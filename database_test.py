@@ -0,0 +1,48 @@
+import unittest
+import main
+import database
+
+
+class TestDatabase(unittest.TestCase):
+
+    def test_add_run(self):
+        graph = {
+            'a': {'bazelized': False, 'children': ['b', 'c', 'serde']},
+            'b': {'bazelized': False, 'children': ['d']},
+            'c': {'bazelized': True, 'children': ['d']},
+            'd': {'bazelized': False, 'children': []},
+            'e': {'bazelized': False, 'children': ['d']},
+        }
+        data = [
+            {'cargo_toml': {'name': 'd'}, 'bazel_path': 'd/BUILD.bazel',
+             'build_bazel': [{'rule': 'rust_library', 'name': 'd', 'crate_name': 'd_lib'}]},
+            {'cargo_toml': {'name': 'e'}, 'bazel_path': None},
+        ]
+        subtree = main.extract_subtree(graph, 'a')
+        main.apply_heights(subtree, main.compute_heights(graph, list(graph)))
+        main.add_parent_count(subtree)
+        db = database.Database(':memory:', data)
+        run_id = db.add_run(subtree, 'a', False, main.calculate_progress(subtree))
+        db.add_run(subtree, 'a', True, main.calculate_progress(subtree))
+        db.commit()
+
+        connection = db.connection
+        self.assertEqual(database.latest_run(connection, 'a', False), run_id)
+        self.assertEqual(connection.execute('SELECT scan_id, bazel, total FROM runs').fetchall(), [(1, 1, 5), (1, 1, 5)])
+        self.assertEqual(connection.execute('SELECT name FROM packages WHERE external = 1 AND run_id = ?',
+                                            (run_id,)).fetchall(), [('serde',)])
+        self.assertEqual(connection.execute('SELECT COUNT(*) FROM edges WHERE run_id = ?', (run_id,)).fetchone(), (5,))
+        # Rules are stored once per scan.
+        self.assertEqual(connection.execute('SELECT crate, rule, crate_name FROM bazel_rules').fetchall(),
+                         [('d', 'rust_library', 'd_lib')])
+        db.update(data)
+        db.add_run(subtree, 'a', False, main.calculate_progress(subtree))
+        self.assertEqual(connection.execute('SELECT COUNT(*) FROM bazel_rules WHERE scan_id = 2').fetchone(), (1,))
+        self.assertEqual(database.reachable(connection, run_id, 'a'), [('d', 0, 2), ('b', 1, 1)])
+        self.assertEqual(database.reachable(connection, run_id, 'a', min_parents=1), [('d', 0, 2)])
+        with self.assertRaises(KeyError):
+            database.latest_run(connection, 'b', False)
+
+
+if __name__ == '__main__':
+    unittest.main()
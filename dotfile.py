@@ -0,0 +1,148 @@
+#!/usr/bin/python3
+from common import FAKE_ROOT, node_label
+
+
+SUMMARY_PREFIX = 'migrated-region-'
+
+
+def topological_order(graph):
+    # Children before parents, children that are not nodes are skipped.
+    order = []
+    visited = set()
+    for start in graph:
+        if start in visited:
+            continue
+        visited.add(start)
+        stack = [(start, iter(graph[start].get('children', [])))]
+        while stack:
+            package_name, children = stack[-1]
+            for child in children:
+                if child in graph and child not in visited:
+                    visited.add(child)
+                    stack.append((child, iter(graph[child].get('children', []))))
+                    break
+            else:
+                stack.pop()
+                order.append(package_name)
+    return order
+
+
+def fully_migrated(graph, order=None):
+    # Packages migrated together with all their descendants.
+    result = set()
+    for package_name in order or topological_order(graph):
+        info = graph[package_name]
+        if package_name != FAKE_ROOT and info.get('bazelized', False) and all(
+                x in result or x not in graph for x in info.get('children', [])):
+            result.add(package_name)
+    return result
+
+
+def migrated_regions(graph, migrated):
+    # Connected components of fully migrated packages, union-find.
+    parent = {x: x for x in migrated}
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for package_name in migrated:
+        for child in graph[package_name].get('children', []):
+            if child in migrated:
+                parent[find(child)] = find(package_name)
+    regions = {}
+    for package_name in graph:
+        if package_name in migrated:
+            regions.setdefault(find(package_name), []).append(package_name)
+    return list(regions.values())
+
+
+def collapse_migrated(graph):
+    # New graph where every region of fully migrated packages is replaced by
+    # a single summary node.
+    migrated = fully_migrated(graph)
+    summary = {}
+    result = {}
+    regions = migrated_regions(graph, migrated)
+    for i, region in enumerate(regions):
+        for package_name in region:
+            summary[package_name] = f'{SUMMARY_PREFIX}{i}'
+    for package_name in graph:
+        if package_name in migrated:
+            continue
+        children = [summary.get(x, x) for x in graph[package_name].get('children', [])]
+        result[package_name] = dict(graph[package_name], children=list(dict.fromkeys(children)))
+    for i, region in enumerate(regions):
+        result[f'{SUMMARY_PREFIX}{i}'] = {'children': [], 'bazelized': True, 'summary': region}
+    return result
+
+
+def transitive_reduction(graph):
+    # New graph without edges implied by longer paths, the graph must not
+    # have cycles. Reachable sets are bitsets stored in Python ints.
+    order = topological_order(graph)
+    ids = {x: i for i, x in enumerate(order)}
+    reach = {}
+    result = {}
+    for package_name in order:
+        children = [x for x in graph[package_name].get('children', []) if x in ids]
+        implied = 0
+        for child in children:
+            implied |= reach[child]
+        result[package_name] = dict(graph[package_name], children=[
+            x for x in graph[package_name].get('children', []) if x not in ids or not implied >> ids[x] & 1])
+        reachable = implied
+        for child in children:
+            reachable |= 1 << ids[child]
+        reach[package_name] = reachable
+    return {x: result[x] for x in graph}
+
+
+def quote(text):
+    return '"' + str(text).replace('"', '\\"') + '"'
+
+
+def node_line(package_name, info):
+    if 'summary' in info:
+        region = info['summary']
+        node_text = f'{len(region)} migrated\n{region[0]}' + ('\n...' if len(region) > 1 else '')
+        return f'{quote(package_name)} [label={quote(node_text)} fillcolor=green shape=box3d style=filled]\n'
+    node_text, fillcolor = node_label(package_name, info)
+    return f'{quote(package_name)} [label={quote(node_text)} fillcolor={quote(fillcolor)} style=filled]\n'
+
+
+def write_dot(graph, path, collapse=False, reduce=False, clusters=None):
+    # Stream DOT text to the file, `clusters` maps packages to cluster names.
+    if collapse:
+        graph = collapse_migrated(graph)
+    if reduce:
+        graph = transitive_reduction(graph)
+    names = [x for x in graph if x != FAKE_ROOT]
+    nodes_n = len(names)
+    edges_n = sum(len(graph[x].get('children', [])) for x in names)
+    print(f'Plotting {nodes_n} nodes with {edges_n} edges...')
+
+    groups = {}
+    for package_name in names:
+        cluster = clusters.get(package_name) if clusters else None
+        groups.setdefault(cluster, []).append(package_name)
+
+    with open(path, 'w') as f:
+        f.write('digraph {\n')
+        for cluster, packages in groups.items():
+            indent = '\t'
+            if cluster is not None:
+                f.write(f'\tsubgraph {quote("cluster_" + cluster)} {{\n\t\tlabel={quote(cluster)}\n')
+                indent = '\t\t'
+            for package_name in packages:
+                f.write(indent + node_line(package_name, graph[package_name]))
+            if cluster is not None:
+                f.write('\t}\n')
+        for package_name in names:
+            source = quote(package_name)
+            for child in graph[package_name].get('children', []):
+                f.write(f'\t{source} -> {quote(child)}\n')
+        f.write('}\n')
+    return nodes_n, edges_n
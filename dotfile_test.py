@@ -0,0 +1,56 @@
+import os
+import shutil
+import tempfile
+import unittest
+import dotfile
+
+
+class TestDotFile(unittest.TestCase):
+
+    def test_collapse_migrated(self):
+        graph = {
+            'a': {'children': ['b', 'c']},
+            'b': {'children': ['d'], 'bazelized': True},
+            'c': {'children': ['d', 'e'], 'bazelized': True},
+            'd': {'children': [], 'bazelized': True},
+            'e': {'children': []},
+        }
+        result = dotfile.collapse_migrated(graph)
+        summary = f'{dotfile.SUMMARY_PREFIX}0'
+        self.assertEqual(list(result), ['a', 'c', 'e', summary])
+        self.assertEqual(result['a']['children'], [summary, 'c'])
+        self.assertEqual(result['c']['children'], [summary, 'e'])
+        self.assertEqual(result[summary]['summary'], ['b', 'd'])
+        self.assertEqual(graph['a']['children'], ['b', 'c'])
+
+    def test_transitive_reduction(self):
+        graph = {
+            'a': {'children': ['b', 'c', 'd', 'serde']},
+            'b': {'children': ['c']},
+            'c': {'children': ['d']},
+            'd': {'children': []},
+        }
+        result = dotfile.transitive_reduction(graph)
+        self.assertEqual(result['a']['children'], ['b', 'serde'])
+        self.assertEqual(result['b']['children'], ['c'])
+        self.assertEqual(result['c']['children'], ['d'])
+
+    def test_write_dot(self):
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, 'graph.gv')
+            graph = {
+                'a': {'children': ['b'], 'height': 1},
+                'b': {'children': [], 'bazelized': True},
+            }
+            self.assertEqual(dotfile.write_dot(graph, path, clusters={'a': 'dir'}), (2, 1))
+            with open(path) as f:
+                text = f.read()
+            self.assertIn('subgraph "cluster_dir"', text)
+            self.assertIn('"a" -> "b"', text)
+        finally:
+            shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,269 @@
+#!/usr/bin/python3
+import os
+import csv
+import json
+import time
+import argparse
+import subprocess
+import main
+from cache import CACHE_VERSION
+from walk import is_excluded, DEFAULT_EXCLUDE
+
+
+HISTORY_COLUMNS = [
+    'commit',
+    'date',
+    'root',
+    'bazel',
+    'total',
+    'progress',
+]
+# Tree entry modes, symlinks and submodules are skipped.
+TREE_MODE = b'40000'
+FILE_MODES = [b'100644', b'100755']
+PACKAGE_FILES = {
+    b'Cargo.toml': 'cargo',
+    b'BUILD.bazel': 'bazel',
+}
+
+
+class GitObjects:
+    # Reads objects of a local repository through one long-lived
+    # `git cat-file --batch` process.
+
+    def __init__(self, repo):
+        self.process = subprocess.Popen(['git', '-C', repo, 'cat-file', '--batch'],
+                                        stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        self.reads = 0
+
+    def read(self, name):
+        # Returns `(hash, type, content)` of an object, eg. a hash or `<commit>:<path>`.
+        self.process.stdin.write(f'{name}\n'.encode())
+        self.process.stdin.flush()
+        header = self.process.stdout.readline().split()
+        if len(header) != 3:
+            raise KeyError(name)
+        size = int(header[2])
+        content = self.process.stdout.read(size + 1)[:size]
+        self.reads += 1
+        return header[0].decode(), header[1].decode(), content
+
+    def close(self):
+        self.process.stdin.close()
+        self.process.wait()
+
+
+def tree_entries(content):
+    # Yields `(mode, name, hash)` of a raw tree object.
+    pos = 0
+    while pos < len(content):
+        space = content.index(b' ', pos)
+        end = content.index(b'\0', space)
+        yield content[pos:space], content[space + 1:end], content[end + 1:end + 21].hex()
+        pos = end + 21
+
+
+def list_commits(repo, revisions, first_parent=True):
+    # Oldest first, returns `(hash, commit timestamp)` pairs.
+    command = ['git', '-C', repo, 'rev-list', '--reverse', '--timestamp']
+    if first_parent:
+        command.append('--first-parent')
+    output = subprocess.run(command + [revisions, '--'], capture_output=True, text=True, check=True).stdout
+    commits = []
+    for line in output.split('\n'):
+        if line:
+            timestamp, commit = line.split()
+            commits.append((commit, int(timestamp)))
+    return commits
+
+
+class History:
+    # Trees are listed and blobs parsed once per hash, unchanged directories
+    # and files are never read again across commits.
+
+    def __init__(self, objects, exclude=DEFAULT_EXCLUDE, parsed=None):
+        self.objects = objects
+        self.exclude = exclude
+        self.trees = {}
+        self.parsed = parsed if parsed is not None else {}
+        self.hits = 0
+        self.misses = 0
+
+    def packages(self, tree):
+        # Returns `(directory, Cargo.toml hash, BUILD.bazel hash or None)`
+        # of every crate in the tree, directories are relative to it.
+        result = self.trees.get(tree)
+        if result is not None:
+            return result
+        _, _, content = self.objects.read(tree)
+        files = {}
+        result = []
+        subtrees = []
+        for mode, name, object_hash in tree_entries(content):
+            if mode == TREE_MODE:
+                name = name.decode()
+                if not is_excluded(name, self.exclude):
+                    subtrees.append((name, object_hash))
+            elif mode in FILE_MODES and name in PACKAGE_FILES:
+                files[PACKAGE_FILES[name]] = object_hash
+        if 'cargo' in files:
+            result.append(('', files['cargo'], files.get('bazel')))
+        for name, subtree in subtrees:
+            result += [(f'{name}/{x}' if x else name, y, z) for x, y, z in self.packages(subtree)]
+        self.trees[tree] = result
+        return result
+
+    def parse(self, kind, blob):
+        key = f'{kind}:{blob}'
+        value = self.parsed.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+        self.misses += 1
+        _, _, content = self.objects.read(blob)
+        value = main.PARSERS[kind](content.decode())
+        self.parsed[key] = value
+        return value
+
+    def scan(self, commit, source_dir):
+        # Same as `main.scan_packages` for the source directory of a commit.
+        # Returns the data and the source directory tree hash.
+        try:
+            tree, object_type, _ = self.objects.read(f'{commit}:{source_dir}')
+        except KeyError:
+            return [], None
+        if object_type != 'tree':
+            return [], None
+        data = []
+        for directory, cargo_blob, bazel_blob in self.packages(tree):
+            path = os.path.join(source_dir, directory)
+            entry = {
+                'cargo_path': os.path.join(path, 'Cargo.toml'),
+                'bazel_path': os.path.join(path, 'BUILD.bazel') if bazel_blob is not None else None,
+                'cargo_toml': self.parse('cargo', cargo_blob),
+            }
+            if bazel_blob is not None:
+                entry['build_bazel'] = self.parse('bazel', bazel_blob)
+            data.append(entry)
+        return data, tree
+
+
+def progress(data, reports, skip_3rd_party, force_migrated):
+    # Returns `(report name, bazel, total, ratio)` of every `(root, dev)`
+    # report, cycles are condensed same as in `main.py`.
+    result = []
+    for dev_dependencies in dict.fromkeys(x[1] for x in reports):
+        graph = main.graph_from_packages(data, skip_3rd_party, dev_dependencies, False, force_migrated)
+        graph, names = main.condense_cycles(graph, main.find_cycles(graph))
+        for root_package, dev in reports:
+            if dev == dev_dependencies:
+                subtree = main.extract_subtree(graph, main.report_root(graph, root_package, names))
+                result.append((main.report_name(root_package, dev),) + main.calculate_progress(subtree))
+    return result
+
+
+def progress_history(history, commits, source_dir, reports, skip_3rd_party, force_migrated):
+    # Yields history rows commit by commit, the graph is built again only
+    # when the source directory tree changes.
+    results = {}
+    for commit, timestamp in commits:
+        data, tree = history.scan(commit, source_dir)
+        if tree not in results:
+            results[tree] = progress(data, reports, skip_3rd_party, force_migrated)
+        date = time.strftime('%Y-%m-%d %H:%M', time.gmtime(timestamp))
+        for root, bazel_n, total, ratio in results[tree]:
+            yield {
+                'commit': commit,
+                'date': date,
+                'root': root,
+                'bazel': bazel_n,
+                'total': total,
+                'progress': f'{ratio:.4f}',
+            }
+
+
+def load_parsed(path):
+    # Parse results by blob hash, kept between runs.
+    try:
+        with open(path, 'r') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if data.get('version') != CACHE_VERSION:
+        return {}
+    return data.get('entries', {})
+
+
+def save_parsed(path, parsed):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump({'version': CACHE_VERSION, 'entries': parsed}, f)
+    os.replace(tmp_path, path)
+
+
+def run():
+    # Parse agruments.
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '-repo', '--repo', help='local git repository', default='../ic')
+    parser.add_argument(
+        '-rev', '--revisions', help='commit range, eg. `v1..main`', default='HEAD')
+    parser.add_argument(
+        '-st', '--step', help='use every N-th commit, the last one is always used', type=int, default=1)
+    parser.add_argument(
+        '-fp', '--first_parent', help='follow the first parent of merge commits only', type=main.str2bool, default=True)
+    parser.add_argument(
+        '-sd', '--source_dir', help='source directory inside the repository', default='rs')
+    parser.add_argument(
+        '-rps', '--root_packages', help='root packages', nargs='+', default=['all'])
+    parser.add_argument(
+        '-var', '--variants', help='dev-dependencies variants, eg. `no yes`', type=main.str2bool, nargs='+',
+        default=[True])
+    parser.add_argument(
+        '-s3p', '--skip_3rd_party', help='skip 3rd party package dependencies', type=main.str2bool, default=True)
+    parser.add_argument(
+        '-f', '--force_migrated_file', help='input file with a list of packages, considered migrated', default='./force_migrated.txt')
+    parser.add_argument(
+        '-ex', '--exclude', help='directory name patterns skipped while scanning', nargs='*', default=DEFAULT_EXCLUDE)
+    parser.add_argument(
+        '-cp', '--cache_path', help='parse results by blob hash, empty to disable', default='./.cache/history_cache.json')
+    parser.add_argument(
+        '-csv', '--csv_path', help='CSV output file', default='./output/history.csv')
+    args = parser.parse_args()
+
+    force_migrated = main.read(args.force_migrated_file).strip().split('\n')
+    reports = [(x, y) for x in args.root_packages for y in args.variants]
+    source_dir = args.source_dir.strip('/')
+    if source_dir == os.curdir:
+        source_dir = ''
+
+    commits = list_commits(args.repo, args.revisions, args.first_parent)
+    sampled = commits[::max(args.step, 1)]
+    if commits and sampled[-1] != commits[-1]:
+        sampled.append(commits[-1])
+    print(f'Commits / sampled: {len(commits)} / {len(sampled)}')
+
+    objects = GitObjects(args.repo)
+    history = History(objects, args.exclude, load_parsed(args.cache_path) if args.cache_path else None)
+    directory = os.path.dirname(args.csv_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(args.csv_path, 'w+') as f:
+        writer = csv.DictWriter(f, HISTORY_COLUMNS)
+        writer.writeheader()
+        for row in progress_history(history, sampled, source_dir, reports, args.skip_3rd_party, force_migrated):
+            writer.writerow(row)
+            print(f'{row["commit"][:12]} {row["date"]} {row["root"]}: '
+                  f'{row["bazel"]} / {row["total"]} / {100*float(row["progress"]):>5.01f}%')
+    objects.close()
+
+    print(f'Objects read / parse cache hits / misses: {objects.reads} / {history.hits} / {history.misses}')
+    if args.cache_path:
+        save_parsed(args.cache_path, history.parsed)
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,72 @@
+import os
+import shutil
+import tempfile
+import unittest
+import subprocess
+import history
+
+
+CARGO_TOML = '''[package]
+name = "{name}"
+
+[dependencies]
+{dependencies}
+'''
+BUILD_BAZEL = '''rust_library(
+    name = "{name}",
+)
+'''
+
+
+def git(repo, *args):
+    subprocess.run(['git', '-C', repo, '-c', 'user.name=test', '-c', 'user.email=test@test'] + list(args),
+                   check=True, capture_output=True)
+
+
+def write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        f.write(text)
+
+
+@unittest.skipIf(shutil.which('git') is None, 'git is not installed')
+class TestHistory(unittest.TestCase):
+
+    def setUp(self):
+        self.repo = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.repo)
+        git(self.repo, 'init', '-q')
+        write(f'{self.repo}/rs/a/Cargo.toml', CARGO_TOML.format(name='a', dependencies='b = "1"\nserde = "1"'))
+        write(f'{self.repo}/rs/b/Cargo.toml', CARGO_TOML.format(name='b', dependencies=''))
+        write(f'{self.repo}/rs/target/c/Cargo.toml', CARGO_TOML.format(name='c', dependencies=''))
+        git(self.repo, 'add', '-A')
+        git(self.repo, 'commit', '-qm', 'first')
+        write(f'{self.repo}/rs/b/BUILD.bazel', BUILD_BAZEL.format(name='b'))
+        git(self.repo, 'add', '-A')
+        git(self.repo, 'commit', '-qm', 'second')
+
+    def test_scan(self):
+        commits = history.list_commits(self.repo, 'HEAD')
+        self.assertEqual(len(commits), 2)
+        objects = history.GitObjects(self.repo)
+        self.addCleanup(objects.close)
+        scanner = history.History(objects)
+        data, _ = scanner.scan(commits[1][0], 'rs')
+        self.assertEqual([x['cargo_toml']['name'] for x in data], ['a', 'b'])
+        self.assertEqual(data[1]['bazel_path'], 'rs/b/BUILD.bazel')
+        self.assertEqual(data[1]['build_bazel'], [{'rule': 'rust_library', 'name': 'b'}])
+        # Cargo.toml blobs did not change, they are parsed once.
+        scanner.scan(commits[0][0], 'rs')
+        self.assertEqual((scanner.hits, scanner.misses), (2, 3))
+        self.assertEqual(scanner.scan(commits[0][0], 'missing'), ([], None))
+
+    def test_progress_history(self):
+        objects = history.GitObjects(self.repo)
+        self.addCleanup(objects.close)
+        rows = history.progress_history(history.History(objects), history.list_commits(self.repo, 'HEAD'), 'rs',
+                                        [('all', False)], True, [])
+        self.assertEqual([(x['root'], x['bazel'], x['total']) for x in rows], [('all', 0, 3), ('all', 1, 3)])
+
+
+if __name__ == '__main__':
+    unittest.main()
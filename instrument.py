@@ -0,0 +1,80 @@
+#!/usr/bin/python3
+import json
+import time
+import resource
+import tracemalloc
+import contextlib
+
+
+def max_rss():
+    # Kilobytes on Linux.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+class Profiler:
+    # Wall time and max RSS per phase, plus named counters. Peak traced
+    # memory is opt-in, `tracemalloc` slows down allocations a lot and would
+    # inflate wall times. Phases must not be nested. Disabled profiler only
+    # keeps counters.
+
+    def __init__(self, enabled=True, memory=False):
+        self.enabled = enabled
+        self.memory = memory
+        self.phases = []
+        self.counters = {}
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        if not self.enabled:
+            yield
+            return
+        if self.memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            memory = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - start
+            phase = {
+                'name': name,
+                'wall': wall,
+                'max rss': max_rss(),
+            }
+            if self.memory:
+                current, peak = tracemalloc.get_traced_memory()
+                phase['peak memory'] = peak
+                phase['memory delta'] = current - memory
+            self.phases.append(phase)
+
+    def count(self, name, value=1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def report(self):
+        return {
+            'phases': self.phases,
+            'counters': self.counters,
+            'total wall': sum(x['wall'] for x in self.phases),
+            'max rss': max_rss(),
+        }
+
+    def print_report(self):
+        report = self.report()
+        print('')
+        print('Profile:')
+        for phase in report['phases']:
+            if 'peak memory' in phase:
+                memory = f'peak {phase["peak memory"]/(1 << 20):>8.02f} MiB'
+            else:
+                memory = f'max rss {phase["max rss"]/1024:>8.01f} MiB'
+            print(f'  {phase["name"]:<32} {1000*phase["wall"]:>10.02f} ms, {memory}')
+        print(f'  {"total":<32} {1000*report["total wall"]:>10.02f} ms, max rss {report["max rss"]/1024:.01f} MiB')
+        print('Counters:')
+        for name, value in report['counters'].items():
+            print(f'  {name}: {value}')
+
+    def dump(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.report(), f, indent=2)
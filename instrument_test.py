@@ -0,0 +1,36 @@
+import unittest
+from instrument import Profiler
+
+
+class TestProfiler(unittest.TestCase):
+
+    def test_phase(self):
+        profiler = Profiler(memory=True)
+        with profiler.phase('allocate'):
+            data = [0] * 100000
+        profiler.count('nodes', 3)
+        profiler.count('nodes', 2)
+        report = profiler.report()
+        self.assertEqual([x['name'] for x in report['phases']], ['allocate'])
+        self.assertGreaterEqual(report['phases'][0]['peak memory'], 8 * len(data))
+        self.assertEqual(report['counters'], {'nodes': 5})
+
+    def test_no_memory_tracing(self):
+        profiler = Profiler()
+        with profiler.phase('allocate'):
+            pass
+        phase = profiler.report()['phases'][0]
+        self.assertNotIn('peak memory', phase)
+        self.assertGreater(phase['max rss'], 0)
+
+    def test_disabled(self):
+        profiler = Profiler(enabled=False)
+        with profiler.phase('skipped'):
+            pass
+        profiler.count('nodes')
+        self.assertEqual(profiler.phases, [])
+        self.assertEqual(profiler.counters, {'nodes': 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
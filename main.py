@@ -1,183 +1,408 @@
 #!/usr/bin/python3
 import os
 import csv
-import copy
-import toml
+import time
+import cargo
 import bazel
 import argparse
-import graphviz
-from pathlib import Path
+import render
+import plan
+import dotfile
+import snapshot
+from view import GraphView
+from instrument import Profiler
+from compact import CompactGraph
+from cache import ParseCache, DEFAULT_MAX_ENTRIES, digest
+from walk import find_packages, DEFAULT_EXCLUDE
+from common import FAKE_ROOT, ALL_PACKAGES_KEYWORDS, read, str2bool, dev_name, report_name, node_label
 
 
-FAKE_ROOT = 'fake-root'
 RED = (255, 0, 0)
 YELLOW = (255, 255, 0)
 
 
-def read(path):
-    with open(path, 'r') as f:
-        return f.read()
+PARSERS = {
+    'cargo': cargo.loads,
+    'bazel': bazel.loads,
+}
 
 
-def dev_name(name):
-    return f'{name}-[dev]'
+def parse_task(task):
+    # Runs in a worker process, returns only the compact parse result.
+    path, kind = task
+    with open(path, 'rb') as f:
+        data = f.read()
+    return PARSERS[kind](data.decode()), digest(data), len(data)
 
 
-def build_graph(source_dir, skip_3rd_party, dev_dependencies, count_missing, force_migrated):
-    force_migrated = set(force_migrated)
+def parse_files(tasks, cache=None, jobs=1, stats=None):
+    results = {}
+    pending = []
+    for task in tasks:
+        value = cache.lookup(task[0]) if cache is not None else None
+        if value is None:
+            pending.append(task)
+        else:
+            results[task[0]] = value
 
-    # Collect Cargo.toml paths.
-    data = [
-        {
-            'cargo_path': path,
-            'cargo_toml': toml.loads(read(path)),
-            'bazel_path': None,
-        }
-        for path in Path(source_dir).rglob('Cargo.toml')
-    ]
+    if jobs > 1 and len(pending) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        chunksize = max(1, len(pending) // (4 * jobs))
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            parsed = list(pool.map(parse_task, pending, chunksize=chunksize))
+    else:
+        parsed = [parse_task(task) for task in pending]
 
-    # Collect BUILD.bazel paths.
-    for entry in data:
-        path = str(entry['cargo_path']).replace('Cargo.toml', 'BUILD.bazel')
-        if os.path.exists(path):
-            entry['build_bazel'] = bazel.loads(read(path))
+    for (path, kind), (value, sha1, size) in zip(pending, parsed):
+        results[path] = value
+        if cache is not None:
+            cache.store(path, value, sha1)
+        if stats is not None:
+            stats[f'{kind} files parsed'] = stats.get(f'{kind} files parsed', 0) + 1
+            stats['bytes read'] = stats.get('bytes read', 0) + size
+    return results
 
-    # Collect all package names.
-    if skip_3rd_party:
-        packages = [
-            x.get('cargo_toml', {}).get('package', {}).get('name')
-            for x in data
-        ]
-        packages = set([x for x in packages if x is not None])
 
-    # Build graph.
-    graph = {}
+def scan_packages(source_dir, cache=None, jobs=1, exclude=DEFAULT_EXCLUDE, stats=None):
+    # Collect Cargo.toml and BUILD.bazel paths.
+    tasks = []
+    data = []
+    for cargo_path, bazel_path in find_packages(source_dir, exclude, stats):
+        data.append({'cargo_path': cargo_path, 'bazel_path': bazel_path})
+        tasks.append((cargo_path, 'cargo'))
+        if bazel_path is not None:
+            tasks.append((bazel_path, 'bazel'))
+
+    # Parse Cargo.toml and BUILD.bazel files.
+    parsed = parse_files(tasks, cache, jobs, stats)
     for entry in data:
-        info = entry.get('cargo_toml', {})
-        package_name = info.get('package', {}).get('name')
-        if package_name is None:
-            continue
+        entry['cargo_toml'] = parsed[entry['cargo_path']]
+        if entry['bazel_path'] is not None:
+            entry['build_bazel'] = parsed[entry['bazel_path']]
+    return data
+
+
+def package_names(data):
+    packages = [x['cargo_toml']['name'] for x in data]
+    return set([x for x in packages if x is not None])
 
-        build_bazel = entry.get('build_bazel', [])
 
-        # Calculate children packages.
-        children = list(info.get('dependencies', {}).keys())
+def add_package(graph, entry, packages, dev_dependencies, count_missing, force_migrated):
+    # Add package node and its DEV node, `packages` is a set of known
+    # packages to skip 3rd party dependencies, or None to keep them.
+    info = entry['cargo_toml']
+    package_name = info['name']
+    if package_name is None:
+        return
+
+    build_bazel = bazel.BazelFile(entry.get('build_bazel', []))
+
+    # Calculate children packages.
+    children = list(info['dependencies'])
+    # Skip 3rd party package dependencies.
+    if packages is not None:
+        children = [x for x in children if x in packages]
+    children = sorted(children, reverse=False)  # Stabilaze data.
+    bazelized = bazel.is_bazelized_bin_or_lib(package_name, build_bazel)
+    is_force_migrated = package_name in force_migrated
+    graph[package_name] = {
+        'bazelized': bazelized or is_force_migrated,
+        'children': children,
+        'force_migrated': is_force_migrated,
+    }
+
+    # Calculate children DEV packages.
+    package_name_dev = dev_name(package_name)
+    children_dev = list(info['dev-dependencies'])
+    if dev_dependencies and len(children_dev) > 0:
         # Skip 3rd party package dependencies.
-        if skip_3rd_party:
-            children = [x for x in children if x in packages]
-        children = sorted(children, reverse=False)  # Stabilaze data.
-        bazelized = bazel.is_bazelized_bin_or_lib(package_name, build_bazel)
-        is_force_migrated = package_name in force_migrated
-        graph[package_name] = {
+        if packages is not None:
+            children_dev = [x for x in children_dev if x in packages]
+        # Stabilaze data.
+        children_dev = sorted(children_dev, reverse=False)
+        bazelized = bazel.is_bazelized_test(package_name, build_bazel)
+        is_force_migrated = package_name_dev in force_migrated
+        graph[package_name_dev] = {
             'bazelized': bazelized or is_force_migrated,
-            'children': children,
+            'children': children_dev,
             'force_migrated': is_force_migrated,
         }
+        graph[package_name_dev]['children'] += [package_name]
+
+    # Count missing Cargo attributes in Bazel files.
+    if count_missing:
+        # Count missing `bin`.
+        missing_count = 0
+        missing_count_dev = 0
+        # Unfold array of tables `[[bin]]`.
+        for block in info['bin']:
+            name = block['name']
+            if name is None:
+                continue
+            if not build_bazel.has_rule(['rust_binary', 'rust_canister'], name):
+                if block['path'].startswith('test/'):
+                    missing_count_dev += 1
+                else:
+                    missing_count += 1
+        graph[package_name]['missing bin'] = missing_count
+        if graph.get(package_name_dev):
+            graph[package_name_dev]['missing bin'] = missing_count_dev
+
+        # Count missing `lib`.
+        missing_count = 0
+        missing_count_dev = 0
+        block = info['lib']
+        if block is not None:
+            if name := block['name']:
+                if not build_bazel.has_rule(['rust_library'], name):
+                    if block['path'].startswith('test/'):
+                        missing_count_dev += 1
+                    else:
+                        missing_count += 1
+        graph[package_name]['missing lib'] = missing_count
+        if graph.get(package_name_dev):
+            graph[package_name_dev]['missing lib'] = missing_count_dev
+
+        # Count missing `bench`.
+        missing_count = 0
+        missing_count_dev = 0
+        # Unfold array of tables `[[bench]]`.
+        for block in info['bench']:
+            if name := block['name']:
+                is_missing = not build_bazel.has_rule(['rust_binary'], name) and not build_bazel.has_rule(
+                    ['rust_binary'], f'{package_name}_bench')
+                if is_missing:
+                    # Benches are DEV dependencies always.
+                    missing_count_dev += 1
+        graph[package_name]['missing bench'] = missing_count
+        if graph.get(package_name_dev):
+            graph[package_name_dev]['missing bench'] = missing_count_dev
+
+
+def graph_from_packages(data, skip_3rd_party, dev_dependencies, count_missing, force_migrated):
+    force_migrated = set(force_migrated)
 
-        # Calculate children DEV packages.
-        package_name_dev = dev_name(package_name)
-        children_dev = list(info.get('dev-dependencies', {}).keys())
-        if dev_dependencies and len(children_dev) > 0:
-            # Skip 3rd party package dependencies.
-            if skip_3rd_party:
-                children_dev = [x for x in children_dev if x in packages]
-            # Stabilaze data.
-            children_dev = sorted(children_dev, reverse=False)
-            bazelized = bazel.is_bazelized_test(package_name, build_bazel)
-            is_force_migrated = package_name_dev in force_migrated
-            graph[package_name_dev] = {
-                'bazelized': bazelized or is_force_migrated,
-                'children': children_dev,
-                'force_migrated': is_force_migrated,
-            }
-            graph[package_name_dev]['children'] += [package_name]
-
-        # Count missing Cargo attributes in Bazel files.
-        if count_missing:
-            def has_rule(bazel_rules, rule_types, name):
-                for bazel_rule in bazel_rules:
-                    is_name_found = name in bazel_rule.get(
-                        'name', []) or name in bazel_rule.get('crate_name', [])
-                    if bazel_rule.get('rule') in rule_types and is_name_found:
-                        return True
-                return False
-
-            # Count missing `bin`.
-            missing_count = 0
-            missing_count_dev = 0
-            # Unfold array of tables `[[bin]]`.
-            blocks = entry['cargo_toml'].get('bin')
-            if blocks is not None:
-                for block in blocks:
-                    name = block.get('name')
-                    if name is None:
-                        continue
-                    if not has_rule(build_bazel, ['rust_binary', 'rust_canister'], name):
-                        if block.get('path', '').startswith('test/'):
-                            missing_count_dev += 1
-                        else:
-                            missing_count += 1
-            graph[package_name]['missing bin'] = missing_count
-            if graph.get(package_name_dev):
-                graph[package_name_dev]['missing bin'] = missing_count_dev
-
-            # Count missing `lib`.
-            missing_count = 0
-            missing_count_dev = 0
-            block = entry['cargo_toml'].get('lib')
-            if block is not None:
-                if name := block.get('name'):
-                    if not has_rule(build_bazel, ['rust_library'], name):
-                        if block.get('path', '').startswith('test/'):
-                            missing_count_dev += 1
-                        else:
-                            missing_count += 1
-            graph[package_name]['missing lib'] = missing_count
-            if graph.get(package_name_dev):
-                graph[package_name_dev]['missing lib'] = missing_count_dev
-
-            # Count missing `bench`.
-            missing_count = 0
-            missing_count_dev = 0
-            # Unfold array of tables `[[bench]]`.
-            blocks = entry['cargo_toml'].get('bench')
-            if blocks is not None:
-                for block in blocks:
-                    if name := block.get('name'):
-                        is_missing = not has_rule(build_bazel, ['rust_binary'], name) and not has_rule(
-                            build_bazel, ['rust_binary'], f'{package_name}_bench')
-                        if is_missing:
-                            # Benches are DEV dependencies always.
-                            missing_count_dev += 1
-            graph[package_name]['missing bench'] = missing_count
-            if graph.get(package_name_dev):
-                graph[package_name_dev]['missing bench'] = missing_count_dev
+    # Collect all package names.
+    packages = package_names(data) if skip_3rd_party else None
 
+    # Build graph.
+    graph = {}
+    for entry in data:
+        add_package(graph, entry, packages, dev_dependencies, count_missing, force_migrated)
     return graph
 
 
-def mark_subtree(graph, current, target, path, is_found=False):
-    info = graph.get(current)
-    if info is None or info.get('traversing_status') == 'found':
-        return
-    path += [current]  # Add current to path.
-    if info.get('traversing_status') == 'searching':
-        raise ValueError(f'Unexpected graph cycle, see path: {path}')
-    info['traversing_status'] = 'searching'
-    is_found = is_found or current == target
-    for child in info.get('children', []):
-        mark_subtree(graph, child, target, path, is_found)
-    info['traversing_status'] = 'found' if is_found else 'not-found'
-    path.pop()         # Remove current from path.
-
-
-def remove_unwanted_nodes(graph):
-    subtree = {}
+def build_graph(source_dir, skip_3rd_party, dev_dependencies, count_missing, force_migrated, cache=None, jobs=1,
+                exclude=DEFAULT_EXCLUDE, stats=None):
+    data = scan_packages(source_dir, cache, jobs, exclude, stats)
+    return graph_from_packages(data, skip_3rd_party, dev_dependencies, count_missing, force_migrated)
+
+
+def patch_graph(graph, old_data, new_data, skip_3rd_party, dev_dependencies, count_missing,
+                old_force_migrated, force_migrated):
+    # Update nodes of changed packages in place, returns changed node names.
+    old_force_migrated = set(old_force_migrated)
+    force_migrated = set(force_migrated)
+    old_entries = {x['cargo_path']: x for x in old_data}
+    new_entries = {x['cargo_path']: x for x in new_data}
+
+    if skip_3rd_party and package_names(old_data) != package_names(new_data):
+        # Set of known packages changed, children of any package may change.
+        new_graph = graph_from_packages(
+            new_data, skip_3rd_party, dev_dependencies, count_missing, force_migrated)
+        changed = set(graph.keys()) ^ set(new_graph.keys())
+        changed.update(x for x in new_graph if x in graph and graph[x] != new_graph[x])
+        graph.clear()
+        graph.update(new_graph)
+        return changed
+
+    def names(entry):
+        package_name = entry['cargo_toml']['name']
+        if package_name is None:
+            return []
+        return [package_name, dev_name(package_name)]
+
+    # Packages with changed files, added, removed or with changed force migration.
+    force_changed = old_force_migrated ^ force_migrated
+    changed_paths = []
+    for path in old_entries.keys() | new_entries.keys():
+        old, new = old_entries.get(path), new_entries.get(path)
+        if old is None or new is None or old != new:
+            changed_paths.append(path)
+        elif any(x in force_changed for x in names(new)):
+            changed_paths.append(path)
+
+    changed = set()
+    packages = package_names(new_data) if skip_3rd_party else None
+    for path in changed_paths:
+        if old := old_entries.get(path):
+            for package_name in names(old):
+                if graph.pop(package_name, None) is not None:
+                    changed.add(package_name)
+    for path in changed_paths:
+        if new := new_entries.get(path):
+            add_package(graph, new, packages, dev_dependencies, count_missing, force_migrated)
+            changed.update(x for x in names(new) if x in graph)
+    return changed
+
+
+def find_ancestors(graph, package_names):
+    parents = {}
     for package_name in graph:
-        if graph[package_name].get('traversing_status') == 'found':
-            subtree[package_name] = copy.deepcopy(graph[package_name])
-            del subtree[package_name]['traversing_status']
-    return subtree
+        for child in graph[package_name].get('children', []):
+            parents.setdefault(child, []).append(package_name)
+    ancestors = set()
+    stack = list(package_names)
+    while stack:
+        for parent in parents.get(stack.pop(), []):
+            if parent not in ancestors:
+                ancestors.add(parent)
+                stack.append(parent)
+    return ancestors
+
+
+def update_heights(graph, heights, changed):
+    # Recalculate heights of changed packages and their ancestors only.
+    affected = find_ancestors(graph, changed) | set(changed)
+    for package_name in affected:
+        heights.pop(package_name, None)
+    compute_heights(graph, [x for x in affected if x in graph], heights)
+    return affected
+
+
+def find_cycles(graph):
+    # Iterative Tarjan's algorithm, returns strongly connected components
+    # with more than one package (or a package depending on itself). Names
+    # are sorted, so results do not depend on the graph order.
+    index = {}
+    low = {}
+    stack = []
+    on_stack = set()
+    cycles = []
+    for start in graph:
+        if start in index:
+            continue
+        index[start] = low[start] = len(index)
+        stack.append(start)
+        on_stack.add(start)
+        work = [(start, iter(graph[start].get('children', [])))]
+        while work:
+            package_name, children = work[-1]
+            for child in children:
+                if child not in graph:
+                    continue
+                if child not in index:
+                    index[child] = low[child] = len(index)
+                    stack.append(child)
+                    on_stack.add(child)
+                    work.append((child, iter(graph[child].get('children', []))))
+                    break
+                if child in on_stack:
+                    low[package_name] = min(low[package_name], index[child])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[package_name])
+                if low[package_name] != index[package_name]:
+                    continue
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    component.append(member)
+                    if member == package_name:
+                        break
+                if len(component) > 1 or package_name in graph[package_name].get('children', []):
+                    cycles.append(sorted(component))
+    return sorted(cycles)
+
+
+def condense_cycles(graph, cycles):
+    # New graph where every cycle is a single `a + b + ...` package, migrated
+    # only when all its members are. Returns the graph and member names.
+    names = {}
+    for members in cycles:
+        for package_name in members:
+            names[package_name] = ' + '.join(members)
+    members = {}
+    for package_name in graph:
+        members.setdefault(names.get(package_name, package_name), []).append(package_name)
+
+    result = {}
+    for name, packages in members.items():
+        infos = [graph[x] for x in packages]
+        children = [names.get(x, x) for info in infos for x in info.get('children', [])]
+        result[name] = dict(infos[0], children=[x for x in dict.fromkeys(children) if x != name])
+        if len(packages) > 1 or name in names:
+            result[name]['bazelized'] = all(x.get('bazelized', False) for x in infos)
+            result[name]['force_migrated'] = any(x.get('force_migrated', False) for x in infos)
+            for key in ['missing bin', 'missing lib', 'missing bench']:
+                if key in result[name]:
+                    result[name][key] = sum(x.get(key, 0) for x in infos)
+            result[name]['cycle'] = packages
+    return result, names
+
+
+def condense_graph(graph):
+    # Report all cycles at once and condense them, the graph is returned as
+    # is when there are none.
+    cycles = find_cycles(graph)
+    if not cycles:
+        return graph, {}
+    print('')
+    print(f'Dependency cycles: {len(cycles)}, each is reported as a single package')
+    for members in cycles:
+        print(f'  {", ".join(members)}')
+    return condense_cycles(graph, cycles)
+
+
+def report_root(graph, root_package, names):
+    # Root of a report subtree in a graph with condensed cycles. Nothing
+    # depends on a dev node, so it is never a cycle member and is used as
+    # is when it exists.
+    if dev_name(root_package) in graph:
+        return dev_name(root_package)
+    return names.get(root_package, root_package)
+
+
+def find_descendants(graph, target):
+    # Iterative depth-first search from target, returns visited packages.
+    # Packages being searched are grey, finished ones are black.
+    GREY, BLACK = 1, 2
+    status = {}
+    path = []
+    stack = [(target, iter(graph[target].get('children', [])))]
+    status[target] = GREY
+    path.append(target)
+    while stack:
+        package_name, children = stack[-1]
+        for child in children:
+            info = graph.get(child)
+            if info is None:
+                continue
+            child_status = status.get(child)
+            if child_status == BLACK:
+                continue
+            if child_status == GREY:
+                cycle = path[path.index(child):] + [child]
+                raise ValueError(f'Unexpected graph cycle, see path: {cycle}')
+            status[child] = GREY
+            path.append(child)
+            stack.append((child, iter(info.get('children', []))))
+            break
+        else:
+            status[package_name] = BLACK
+            path.pop()
+            stack.pop()
+    return status
+
+
+def find_roots(graph):
+    children = set()
+    for package_name in graph:
+        children.update(graph[package_name].get('children', []))
+    return [x for x in graph if x not in children]
 
 
 def extract_subtree(graph, target_package):
@@ -186,36 +411,22 @@ def extract_subtree(graph, target_package):
     if graph.get(new_root) is not None:
         target_package = new_root
 
-    # Get roots.
-    roots = set(graph.keys())
-    for package_name in graph:
-        for child in graph[package_name]['children']:
-            roots.discard(child)
+    if isinstance(graph, CompactGraph):
+        if str(target_package).strip() in ALL_PACKAGES_KEYWORDS:
+            target_package = None
+        return graph.extract_subtree(target_package, FAKE_ROOT)
 
     # Link all the roots to a fake root.
-    graph[FAKE_ROOT] = {'children': roots}
-    # print(f'Root nodes linked to "{FAKE_ROOT}": {len(roots)}')
-
-    all_packages_keywords = [
-        'None',
-        'none',
-        'default',
-        '.',
-        'all',
-        '',
-    ]
-    if str(target_package).strip() in all_packages_keywords:
-        return graph
-
-    # Extract target package subtree.
-    path = []
-    mark_subtree(graph, FAKE_ROOT, target_package, path)
-    subtree = remove_unwanted_nodes(graph)
-
-    # Add fake root to a subtree.
-    subtree[FAKE_ROOT] = {'children': [target_package]}
+    if str(target_package).strip() in ALL_PACKAGES_KEYWORDS:
+        roots = find_roots(graph)
+        return GraphView(graph, list(graph), {FAKE_ROOT: {'children': roots}})
 
-    return subtree
+    # Extract target package subtree, `graph` is not modified.
+    subtree = {}
+    if graph.get(target_package) is not None:
+        subtree = find_descendants(graph, target_package)
+    nodes = [x for x in graph if x in subtree]
+    return GraphView(graph, nodes, {FAKE_ROOT: {'children': [target_package]}})
 
 
 def calculate_progress(graph):
@@ -225,22 +436,115 @@ def calculate_progress(graph):
     return (bazel_n, total, ratio)
 
 
+def compute_heights(graph, starts, heights=None):
+    # Iterative post-order traversal, every node height is computed once.
+    # Migrated and unknown packages get height -1.
+    if heights is None:
+        heights = {}
+    searching = set()
+    stack = [(x, False) for x in starts]
+    while stack:
+        package_name, is_expanded = stack.pop()
+        info = graph.get(package_name)
+        if is_expanded:
+            height = -1
+            for child in info.get('children', []):
+                height = max(height, heights[child])
+            heights[package_name] = height + 1
+            searching.discard(package_name)
+            continue
+        if package_name in heights:
+            continue
+        if package_name in searching:
+            raise ValueError(f'Unexpected graph cycle at: {package_name}')
+        # Skip packages with Bazel.
+        if info is None or info.get('bazelized', False):
+            heights[package_name] = -1
+            continue
+        searching.add(package_name)
+        stack.append((package_name, True))
+        for child in info.get('children', []):
+            if child not in heights:
+                stack.append((child, False))
+    return heights
+
+
 def add_height(graph, current):
-    info = graph.get(current)
-    height = -1
-    # Skip packages with Bazel.
-    if info is None or info.get('bazelized', False):
-        return height
-    for child in info.get('children', []):
-        height = max(height, add_height(graph, child))
-    result = height + 1
-    # Skip fake root node.
-    if current != FAKE_ROOT:
-        info['height'] = result
+    heights = compute_heights(graph, [current])
+    for package_name, height in heights.items():
+        # Skip fake root node.
+        if height >= 0 and package_name != FAKE_ROOT:
+            graph[package_name]['height'] = height
+    return heights[current]
+
+
+def apply_heights(graph, heights):
+    # Same as `add_height(graph, FAKE_ROOT)` with heights precomputed on a
+    # bigger graph: only packages reachable from the fake root through
+    # not migrated packages get a height.
+    visited = set()
+    stack = [FAKE_ROOT]
+    while stack:
+        package_name = stack.pop()
+        info = graph.get(package_name)
+        if package_name in visited or info is None or info.get('bazelized', False):
+            continue
+        visited.add(package_name)
+        # Skip fake root node.
+        if package_name != FAKE_ROOT:
+            info['height'] = heights[package_name]
+        stack.extend(info.get('children', []))
+
+
+def compute_dependents(graph):
+    # Transitive dependents of every package in one pass: ancestors are
+    # integer bitsets over topological positions, parents come first.
+    # Returns `{package: (dependents, not migrated dependents)}`.
+    pending = {x: 0 for x in graph}
+    for package_name in graph:
+        for child in graph[package_name].get('children', []):
+            if child in pending:
+                pending[child] += 1
+    order = [x for x in graph if pending[x] == 0]
+    for package_name in order:
+        for child in graph[package_name].get('children', []):
+            if child in pending:
+                pending[child] -= 1
+                if pending[child] == 0:
+                    order.append(child)
+    if len(order) != len(graph):
+        cycle = sorted(x for x in graph if pending[x] > 0)
+        raise ValueError(f'Unexpected graph cycle, see packages: {cycle}')
+
+    not_migrated = 0
+    for i, package_name in enumerate(order):
+        if not graph[package_name].get('bazelized', False):
+            not_migrated |= 1 << i
+    ancestors = {x: 0 for x in order}
+    result = {}
+    for i, package_name in enumerate(order):
+        bits = ancestors.pop(package_name)
+        result[package_name] = (bits.bit_count(), (bits & not_migrated).bit_count())
+        bits |= 1 << i
+        for child in graph[package_name].get('children', []):
+            if child in ancestors:
+                ancestors[child] |= bits
     return result
 
 
+def apply_dependents(graph, dependents):
+    for package_name in graph:
+        # Skip fake root node.
+        if package_name != FAKE_ROOT and package_name in dependents:
+            info = graph[package_name]
+            info['dependents'], info['not_migrated_dependents'] = dependents[package_name]
+
+
 def add_parent_count(graph):
+    if isinstance(graph, CompactGraph):
+        graph.add_parent_count(skip=FAKE_ROOT)
+        return
+
     # Count number of parents for each child.
     counter = {}
     for package_name in graph:
@@ -288,6 +592,8 @@ def to_graphviz(graph):
     edges_n = sum([len(graph[x].get('children', [])) for x in graph])
     print(f'Plotting {nodes_n} nodes with {edges_n} edges...')
 
+    # Imported on first use, keeps startup fast.
+    import graphviz
     dot = graphviz.Digraph()
 
     # Create nodes.
@@ -295,31 +601,7 @@ def to_graphviz(graph):
         # Skip fake root node.
         if package_name == FAKE_ROOT:
             continue
-
-        node_text = f'{package_name}'
-        fillcolor = 'grey'  # default
-
-        # Display height.
-        height = graph[package_name].get('height')
-        if height is not None:
-            node_text += f'\nheight:{height}'
-
-        # Display parent count.
-        parents = graph[package_name].get('parent_count')
-        if parents is not None:
-            node_text += f'\nparents:{parents}'
-
-        # Display bazel status and color.
-        if graph[package_name].get('bazelized'):
-            node_text += f'\nbazel:yes'
-            fillcolor = 'green'
-
-        # Display not converted node color.
-        color = graph[package_name].get('color')
-        if color is not None:
-            # node_text += f'\ncolor:{color}'
-            fillcolor = color
-
+        node_text, fillcolor = node_label(package_name, graph[package_name])
         dot.node(package_name, node_text, style='filled', fillcolor=fillcolor)
 
     # Create edges.
@@ -334,52 +616,247 @@ def to_graphviz(graph):
     return dot
 
 
+CSV_COLUMNS = [
+    'name',
+    'bazel',
+    'height',
+    'parents',
+    'missing bin',
+    'missing lib',
+    'missing bench',
+    'forced',
+    'transitive dependents',
+    'transitive non-migrated dependents',
+]
+MAX_HEIGHT = 1000*1000*1000
+
+
+def csv_row(package_name, info):
+    return {
+        'name': package_name,
+        'bazel': 'yes' if info.get('bazelized') else 'no',
+        'height': info.get('height'),
+        'parents': info.get('parent_count'),
+        'missing bin': info.get('missing bin'),
+        'missing lib': info.get('missing lib'),
+        'missing bench': info.get('missing bench'),
+        'forced': 'yes' if info.get('force_migrated') else 'no',
+        'transitive dependents': info.get('dependents'),
+        'transitive non-migrated dependents': info.get('not_migrated_dependents'),
+    }
+
+
+def csv_order(graph, package_name):
+    # Sort by height (asc, empty at the bottom), forced (asc),
+    # parents (desc) and name (asc).
+    info = graph[package_name]
+    height = info.get('height')
+    parents = info.get('parent_count')
+    return (
+        height if height is not None else MAX_HEIGHT,
+        bool(info.get('force_migrated')),
+        -parents if parents is not None else 0,
+        package_name,
+    )
+
+
+def csv_rows(graph):
+    # Only package names are sorted, rows are generated one by one.
+    names = [x for x in graph if x != FAKE_ROOT]
+    names.sort(key=lambda x: csv_order(graph, x))
+    for package_name in names:
+        yield csv_row(package_name, graph[package_name])
+
+
 def write_csv(graph, path):
-    # Generate table.
-    data = []
-    for package_name in graph:
-        # Skip fake root node.
-        if package_name == FAKE_ROOT:
+    with open(path, 'w+') as f:
+        writer = csv.DictWriter(f, CSV_COLUMNS)
+        writer.writeheader()
+        for row in csv_rows(graph):
+            writer.writerow(row)
+
+
+def read_batch(path):
+    # Each line is `<root package> [<dev dependencies: yes/no>] [<engine>] [<format>]`.
+    reports = []
+    for line in read(path).split('\n'):
+        line = line.split('#')[0].strip()
+        if not line:
             continue
-        info = graph[package_name]
-        data.append({
-            'name': package_name,
-            'bazel': 'yes' if info.get('bazelized') else 'no',
-            'height': info.get('height'),
-            'parents': info.get('parent_count'),
-            'missing bin': info.get('missing bin'),
-            'missing lib': info.get('missing lib'),
-            'missing bench': info.get('missing bench'),
-            'forced': 'yes' if info.get('force_migrated') else 'no',
-        })
-        # Sort by name (asc).
-        data = sorted(data, key=lambda x: x['name'], reverse=False)
-        # Sort by parents (desc).
-        data = sorted(data, key=lambda x: x['parents']
-                      if x['parents'] is not None else 0, reverse=True)
-        # Sort by forced (asc).
-        data = sorted(data, key=lambda x: x['forced'], reverse=False)
-        # Sort by height (asc, empty at the bottom).
-        MAX_HEIGHT = 1000*1000*1000
-        data = sorted(
-            data, key=lambda x: x['height'] if x['height'] is not None else MAX_HEIGHT, reverse=False)
-        # Write to file.
-        with open(path, 'w+') as f:
-            columns = data[0].keys()
-            writer = csv.DictWriter(f, columns)
-            writer.writeheader()
-            writer.writerows(data)
-
-
-def str2bool(v):
-    if isinstance(v, bool):
-        return v
-    if v.lower() in ('yes', 'true', 't', 'y', '1'):
-        return True
-    elif v.lower() in ('no', 'false', 'f', 'n', '0'):
-        return False
+        fields = line.split() + [None] * 3
+        dev_dependencies = str2bool(fields[1]) if fields[1] is not None else False
+        reports.append((fields[0], dev_dependencies, fields[2], fields[3]))
+    return reports
+
+
+def write_report(graph, heights, root_package, csv_path, graphviz_path, dot_options=None, workers=None,
+                 dependents=None, database=None, dev_dependencies=False, names=None):
+    # Outputs with empty paths are skipped, `names` maps cycle members to
+    # condensed package names.
+    subtree = extract_subtree(graph, report_root(graph, root_package, names or {}))
+
+    progress = calculate_progress(subtree)
+    bazel_n, total, ratio = progress
+    print(
+        f'Packages with bazel / no bazel / total / progress: {bazel_n} / {total-bazel_n} / {total} / {100*ratio:>5.01f}%')
+    if not csv_path and not graphviz_path and database is None:
+        return
+
+    # Calculate attributes (height, parents, color).
+    apply_heights(subtree, heights)
+    if dependents is not None:
+        apply_dependents(subtree, dependents)
+    add_height_color(subtree, RED, YELLOW)
+    add_parent_count(subtree)
+
+    # Write CSV output.
+    if csv_path:
+        write_csv(subtree, csv_path)
+
+    # Add run to the SQLite database, committed by the caller.
+    if database is not None:
+        database.add_run(subtree, root_package, dev_dependencies, progress)
+
+    # Write migration plan next to the CSV output.
+    if csv_path and workers:
+        rows, summary = plan.plan(subtree, workers)
+        plan.write_plan(rows, plan.plan_path(csv_path))
+        print(f'Migration waves / critical path / schedule length with {workers} workers: '
+              f'{summary["waves"]} / {len(summary["critical path"])} / {summary["schedule length"]}')
+
+    # Generate Graphviz source, rendering is done separately.
+    if not graphviz_path:
+        return
+    if dot_options is not None:
+        # Stream DOT text to the file.
+        dotfile.write_dot(subtree, graphviz_path, **dot_options)
     else:
-        raise argparse.ArgumentTypeError('Boolean value expected.')
+        to_graphviz(subtree).save(graphviz_path)
+
+
+def graphviz_options(args, data):
+    # Options of the streamed DOT writer, None for the default output.
+    if not (args.graphviz_collapse or args.graphviz_reduce or args.graphviz_clusters):
+        return None
+    clusters = None
+    if args.graphviz_clusters:
+        # Cluster crates by the directory containing crate directories.
+        clusters = {}
+        for entry in data:
+            package_name = entry['cargo_toml']['name']
+            if package_name is None:
+                continue
+            directory = os.path.relpath(os.path.dirname(os.path.dirname(entry['cargo_path'])), args.source_dir)
+            if directory != os.curdir:
+                clusters[package_name] = directory
+                clusters[dev_name(package_name)] = directory
+    return {'collapse': args.graphviz_collapse, 'reduce': args.graphviz_reduce, 'clusters': clusters}
+
+
+def write_reports(graph, heights, reports, dev_dependencies, args, profiler=None, dot_options=None, dependents=None,
+                  names=None, database=None):
+    # Returns `(graphviz path, engine, format)` charts to render.
+    profiler = profiler or Profiler(enabled=False)
+    if args.compact_graph:
+        # Speeds up subtree extraction only, it does not lower memory: the
+        # dict graph is still built from the scan and stays the source of
+        # truth (heights, dependents, watch updates).
+        graph = CompactGraph.from_graph(graph)
+    charts = []
+    for root_package, dev, csv_path, graphviz_path, engine, format in reports:
+        if dev != dev_dependencies:
+            continue
+        if args.progress_only:
+            csv_path = None
+            database = None
+        if args.progress_only or args.no_graph:
+            graphviz_path = None
+        # Print header.
+        print('')
+        print(f'Root package: {report_name(root_package, dev)}')
+        with profiler.phase(f'report {report_name(root_package, dev)}'):
+            write_report(graph, heights, root_package, csv_path, graphviz_path, dot_options,
+                         args.workers if args.plan else None, dependents, database, dev, names)
+        if graphviz_path:
+            charts.append((graphviz_path, engine, format))
+    return charts
+
+
+def render_charts(charts, args):
+    # Lay out all charts concurrently.
+    if not args.graphviz_render or not charts:
+        return
+    print('')
+    print(f'Rendering {len(charts)} charts...')
+    for path, error in render.render_all(charts, args.render_jobs):
+        if error is not None:
+            print(f'Rendering {path} failed: {error}')
+        elif args.graphviz_view:
+            import graphviz
+            graphviz.view(path)
+
+
+def watched_files(source_dir, exclude, force_migrated_file):
+    # Modification time and size of every watched file.
+    paths = [force_migrated_file]
+    for cargo_path, bazel_path in find_packages(source_dir, exclude):
+        paths.append(cargo_path)
+        if bazel_path is not None:
+            paths.append(bazel_path)
+    result = {}
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        result[path] = (stat.st_mtime_ns, stat.st_size)
+    return result
+
+
+def watch(args, reports, states, force_migrated, cache, database=None):
+    # Poll watched files, re-parse changed files only and patch the graphs.
+    print('')
+    print(f'Watching {args.source_dir} for changes, press Ctrl+C to stop...')
+    files = watched_files(args.source_dir, args.exclude, args.force_migrated_file)
+    while True:
+        time.sleep(args.watch_interval)
+        new_files = watched_files(args.source_dir, args.exclude, args.force_migrated_file)
+        if new_files == files:
+            continue
+        files = new_files
+
+        new_force_migrated = read(args.force_migrated_file).strip().split('\n')
+        data = scan_packages(args.source_dir, cache, args.jobs, args.exclude)
+        if database is not None:
+            database.update(data)
+        for dev_dependencies, state in states.items():
+            changed = patch_graph(
+                state['graph'], state['data'], data, args.skip_3rd_party, dev_dependencies,
+                counts_missing(args, dev_dependencies), force_migrated, new_force_migrated)
+            state['data'] = data
+            if not changed:
+                continue
+            had_cycles = state['condensed'] is not state['graph']
+            state['condensed'], state['names'] = condense_graph(state['graph'])
+            condensed = state['condensed']
+            affected = set()
+            if state['heights'] is not None:
+                if had_cycles or condensed is not state['graph']:
+                    # Package names changed, recalculate all heights.
+                    state['heights'] = compute_heights(condensed, list(condensed))
+                    affected = set(condensed)
+                else:
+                    affected = update_heights(condensed, state['heights'], changed)
+                state['dependents'] = compute_dependents(condensed)
+            print('')
+            print(f'Changed packages / updated heights: {len(changed)} / {len(affected)}')
+            write_reports(condensed, state['heights'], reports, dev_dependencies, args,
+                          dot_options=graphviz_options(args, data), dependents=state['dependents'],
+                          names=state['names'], database=database)
+        if database is not None:
+            database.commit()
+        force_migrated = new_force_migrated
+        cache.save()
 
 
 def main():
@@ -393,8 +870,32 @@ def main():
         '-gp', '--graphviz_path', help='graphviz output files', default='./output/graph.gv')
     parser.add_argument(
         '-gv', '--graphviz_view', help='graphviz view', type=str2bool, default=False)
+    parser.add_argument(
+        '-pl', '--plan', help='write migration plan to `<CSV name>-plan.csv`', type=str2bool, default=False)
+    parser.add_argument(
+        '-wk', '--workers', help='migration plan: number of people migrating crates in parallel', type=int, default=1)
+    parser.add_argument(
+        '-ng', '--no_graph', help='skip graphviz output, write CSV only', type=str2bool, default=False)
+    parser.add_argument(
+        '-po', '--progress_only', help='print progress only, skip CSV and graphviz outputs', type=str2bool, default=False)
+    parser.add_argument(
+        '-gr', '--graphviz_render', help='render graphviz files, `no` writes `.gv` sources only', type=str2bool, default=True)
+    parser.add_argument(
+        '-ge', '--graphviz_engine', help='graphviz layout engine, eg. `dot`, `sfdp`', default=render.DEFAULT_ENGINE)
+    parser.add_argument(
+        '-gf', '--graphviz_format', help='graphviz output format, eg. `pdf`, `svg`', default=render.DEFAULT_FORMAT)
+    parser.add_argument(
+        '-rj', '--render_jobs', help='number of concurrent graphviz processes', type=int, default=os.cpu_count())
+    parser.add_argument(
+        '-gcm', '--graphviz_collapse', help='collapse fully migrated regions into summary nodes', type=str2bool, default=False)
+    parser.add_argument(
+        '-gtr', '--graphviz_reduce', help='drop edges implied by longer paths (transitive reduction)', type=str2bool, default=False)
+    parser.add_argument(
+        '-gcl', '--graphviz_clusters', help='group crates into clusters by directory', type=str2bool, default=False)
     parser.add_argument(
         '-csv', '--csv_path', help='CSV output file', default='./output/packages.csv')
+    parser.add_argument(
+        '-db', '--database_path', help='SQLite database, every report is added as a run', default=None)
     parser.add_argument(
         '-s3p', '--skip_3rd_party', help='skip 3rd party package dependencies', type=str2bool, default=True)
     parser.add_argument(
@@ -403,37 +904,199 @@ def main():
         '-mis', '--count_missing', help='count missing Cargo attributes in Bazel files', type=str2bool, default=False)
     parser.add_argument(
         '-f', '--force_migrated_file', help='input file with a list of packages, considered migrated', default='./force_migrated.txt')
+    parser.add_argument(
+        '-cp', '--cache_path', help='parse cache file, empty to disable', default='./.cache/parse_cache.json')
+    parser.add_argument(
+        '-cs', '--cache_size', help='max number of files kept in parse cache', type=int, default=DEFAULT_MAX_ENTRIES)
+    parser.add_argument(
+        '-j', '--jobs', help='number of processes parsing files', type=int, default=1)
+    parser.add_argument(
+        '-ex', '--exclude', help='directory name patterns skipped while scanning', nargs='*', default=DEFAULT_EXCLUDE)
+    parser.add_argument(
+        '-cg', '--compact_graph', help='extract report subtrees from a compact integer-indexed copy of the graph '
+        '(faster, not smaller)', type=str2bool, default=False)
+    parser.add_argument(
+        '-ss', '--snapshot_path', help='graph snapshot output file, `-dev` is added for dev-dependencies', default=None)
+    parser.add_argument(
+        '-w', '--watch', help='keep running and update outputs on file changes', type=str2bool, default=False)
+    parser.add_argument(
+        '-wi', '--watch_interval', help='watch mode: seconds between polls', type=float, default=1.0)
+    parser.add_argument(
+        '-prof', '--profile', help='print wall time and max RSS of every phase', type=str2bool, default=False)
+    parser.add_argument(
+        '-pm', '--profile_memory', help='profile mode: trace peak memory of every phase (slow)', type=str2bool,
+        default=False)
+    parser.add_argument(
+        '-pj', '--profile_json', help='profile mode: JSON output file', default=None)
+    parser.add_argument(
+        '-cprof', '--cprofile', help='run with cProfile and dump stats to the file', default=None)
+    parser.add_argument(
+        '-rps', '--root_packages', help='batch mode: root packages', nargs='+', default=None)
+    parser.add_argument(
+        '-var', '--variants', help='batch mode: dev-dependencies variants, eg. `no yes`', type=str2bool, nargs='+', default=None)
+    parser.add_argument(
+        '-misv', '--count_missing_variants', help='batch mode: variants counting missing Cargo attributes, eg. `yes`, '
+        'overrides `--count_missing`', type=str2bool, nargs='+', default=None)
+    parser.add_argument(
+        '-bf', '--batch_file', help='batch mode: file with `<root package> [<dev: yes/no>] [<engine>] [<format>]` lines',
+        default=None)
+    parser.add_argument(
+        '-od', '--output_dir', help='batch mode: output directory for CSV and graphviz files', default='./output')
     args = parser.parse_args()
 
-    # Print header.
-    dev = '-dev' if args.dev_dependencies else ''
-    print('')
-    print(f'Root package: {args.root_package}{dev}')
+    profiler = Profiler(enabled=args.profile, memory=args.profile_memory)
+    if args.cprofile:
+        # Opt-in function level profile of the whole run.
+        import pstats
+        import cProfile
+        cprofiler = cProfile.Profile()
+        cprofiler.runcall(run, args, profiler)
+        cprofiler.dump_stats(args.cprofile)
+        print('')
+        pstats.Stats(cprofiler).sort_stats('cumulative').print_stats(30)
+    else:
+        run(args, profiler)
+
+    if args.profile:
+        profiler.print_report()
+        if args.profile_json:
+            profiler.dump(args.profile_json)
+
+
+def collect_reports(args):
+    # Returns reports, each is (root package, dev dependencies, CSV path,
+    # graphviz path, graphviz engine, graphviz format).
+    reports = []
+    if args.root_packages or args.batch_file:
+        batch = []
+        variants = args.variants or [args.dev_dependencies]
+        for root_package in args.root_packages or []:
+            batch += [(root_package, x, None, None) for x in variants]
+        if args.batch_file:
+            batch += read_batch(args.batch_file)
+        # Same root and variant are written once, later lines win.
+        batch = {(x[0], x[1]): x for x in batch}.values()
+        os.makedirs(args.output_dir, exist_ok=True)
+        for root_package, dev_dependencies, engine, format in batch:
+            name = report_name(root_package, dev_dependencies)
+            reports.append((root_package, dev_dependencies,
+                            os.path.join(args.output_dir, f'{name}.csv'),
+                            os.path.join(args.output_dir, f'{name}.gv'),
+                            engine or args.graphviz_engine, format or args.graphviz_format))
+    else:
+        reports.append((args.root_package, args.dev_dependencies,
+                       args.csv_path, args.graphviz_path, args.graphviz_engine, args.graphviz_format))
+    return reports
 
-    # Read list of packages that are considered migrated.
-    force_migrated = read(args.force_migrated_file).strip().split('\n')
 
-    # Generate graph of package dependencies.
-    graph = build_graph(
-        args.source_dir, skip_3rd_party=args.skip_3rd_party, dev_dependencies=args.dev_dependencies,
-        count_missing=args.count_missing, force_migrated=force_migrated)
-    subtree = extract_subtree(graph, args.root_package)
+def counts_missing(args, dev_dependencies):
+    # Batch mode may count missing attributes for some variants only.
+    if args.count_missing_variants is not None:
+        return dev_dependencies in args.count_missing_variants
+    return args.count_missing
 
-    bazel_n, total, ratio = calculate_progress(subtree)
-    print(
-        f'Packages with bazel / no bazel / total / progress: {bazel_n} / {total-bazel_n} / {total} / {100*ratio:>5.01f}%')
 
-    # Calculate attributes (height, parents, color).
-    add_height(subtree, FAKE_ROOT)
-    add_height_color(subtree, RED, YELLOW)
-    add_parent_count(subtree)
+def run(args, profiler):
+    reports = collect_reports(args)
 
-    # Write CSV output.
-    write_csv(subtree, args.csv_path)
+    with profiler.phase('read inputs'):
+        # Read list of packages that are considered migrated.
+        force_migrated = read(args.force_migrated_file).strip().split('\n')
+
+        # Load cache of parsed Cargo.toml and BUILD.bazel files.
+        cache = None
+        if args.cache_path:
+            cache = ParseCache(args.cache_path, args.cache_size).load()
+        elif args.watch:
+            # Watch mode re-parses changed files only, keep the cache in memory.
+            cache = ParseCache(None, args.cache_size)
+
+    # Scan source directory once.
+    stats = {}
+    with profiler.phase('scan'):
+        data = scan_packages(args.source_dir, cache, args.jobs, args.exclude, stats)
+    print('')
+    print(f'Scanned directories / entries: {stats["directories"]} / {stats["entries"]}')
+    for name, value in stats.items():
+        profiler.count(name, value)
+    profiler.count('BUILD rules', sum(len(x.get('build_bazel', [])) for x in data))
+    if cache is not None:
+        with profiler.phase('save cache'):
+            cache.save()
+
+    # Reports are added to the database in a single transaction.
+    database = None
+    if args.database_path:
+        # Imported on first use, keeps startup fast.
+        from database import Database
+        database = Database(args.database_path, data, args.source_dir)
+
+    # Build graph once per dev-dependencies mode and reuse it for every root.
+    states = {}
+    charts = []
+    for dev_dependencies in dict.fromkeys(x[1] for x in reports):
+        # Generate graph of package dependencies.
+        with profiler.phase(f'build graph{" (dev)" if dev_dependencies else ""}'):
+            graph = graph_from_packages(
+                data, skip_3rd_party=args.skip_3rd_party, dev_dependencies=dev_dependencies,
+                count_missing=counts_missing(args, dev_dependencies), force_migrated=force_migrated)
+        profiler.count('nodes', len(graph))
+        profiler.count('edges', sum(len(graph[x].get('children', [])) for x in graph))
+
+        if args.snapshot_path:
+            meta = {
+                'source_dir': args.source_dir,
+                'skip_3rd_party': args.skip_3rd_party,
+                'dev_dependencies': dev_dependencies,
+                'count_missing': counts_missing(args, dev_dependencies),
+            }
+            snapshot.dump(graph, snapshot.snapshot_path(args.snapshot_path, dev_dependencies), meta)
+
+        # Condense dependency cycles.
+        with profiler.phase(f'cycles{" (dev)" if dev_dependencies else ""}'):
+            condensed, names = condense_graph(graph)
+
+        # Heights do not depend on the root package, calculate them once.
+        heights = None
+        dependents = None
+        if not args.progress_only:
+            with profiler.phase(f'heights{" (dev)" if dev_dependencies else ""}'):
+                heights = compute_heights(condensed, list(condensed))
+            with profiler.phase(f'dependents{" (dev)" if dev_dependencies else ""}'):
+                dependents = compute_dependents(condensed)
+
+        charts += write_reports(condensed, heights, reports, dev_dependencies, args, profiler=profiler,
+                                dot_options=graphviz_options(args, data), dependents=dependents, names=names,
+                                database=database)
+        states[dev_dependencies] = {
+            'data': data,
+            'graph': graph,
+            'condensed': condensed,
+            'names': names,
+            'heights': heights,
+            'dependents': dependents,
+        }
+
+    if database is not None:
+        with profiler.phase('database'):
+            database.commit()
+
+    if cache is not None:
+        print(f'Parse cache hits / misses: {cache.hits} / {cache.misses}')
+        profiler.count('cache hits', cache.hits)
+        profiler.count('cache misses', cache.misses)
+
+    with profiler.phase('render'):
+        render_charts(charts, args)
+
+    if args.watch:
+        try:
+            watch(args, reports, states, force_migrated, cache, database)
+        except KeyboardInterrupt:
+            pass
 
-    # Generate Graphviz.
-    dot = to_graphviz(subtree)
-    dot.render(args.graphviz_path, view=args.graphviz_view)
+    if database is not None:
+        database.close()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,299 @@
+#!/usr/bin/python3
+import os
+import sys
+import argparse
+import copy
+import main
+import time
+import shutil
+import tempfile
+import unittest
+import subprocess
+import benchmark
+from compact import CompactGraph
+
+
+def diamond_graph(depth):
+    # Chain of diamonds: top_i -> (left_i, right_i) -> top_{i+1}.
+    graph = {}
+    for i in range(depth):
+        graph[f'top_{i}'] = {'children': [f'left_{i}', f'right_{i}']}
+        graph[f'left_{i}'] = {'children': [f'top_{i + 1}']}
+        graph[f'right_{i}'] = {'children': [f'top_{i + 1}']}
+    graph[f'top_{depth}'] = {'children': []}
+    graph[main.FAKE_ROOT] = {'children': ['top_0']}
+    return graph
+
+
+class TestMain(unittest.TestCase):
+
+    def test_startup(self):
+        # Heavy modules are imported on first use only.
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import main'],
+                                cwd=os.path.dirname(os.path.abspath(main.__file__)),
+                                capture_output=True, text=True, check=True)
+        elapsed = time.perf_counter() - start
+        modules = [x.split('|')[-1].strip() for x in result.stderr.splitlines()]
+        self.assertIn('main', modules)
+        for module in ['graphviz', 'toml', 'cProfile', 'concurrent.futures', 'sqlite3']:
+            self.assertNotIn(module, modules)
+        self.assertLess(elapsed, 2.0)
+
+    def test_add_height(self):
+        graph = {
+            main.FAKE_ROOT: {'children': ['a', 'b']},
+            'a': {'children': ['b', 'c']},
+            'b': {'children': ['d']},
+            'c': {'children': ['d'], 'bazelized': True},
+            'd': {'children': []},
+        }
+        self.assertEqual(main.add_height(graph, main.FAKE_ROOT), 3)
+        self.assertEqual(graph['a']['height'], 2)
+        self.assertEqual(graph['b']['height'], 1)
+        self.assertEqual(graph['d']['height'], 0)
+        self.assertNotIn('height', graph['c'])
+        self.assertNotIn('height', graph[main.FAKE_ROOT])
+
+    def test_add_height_deep_diamond(self):
+        depth = 5000
+        graph = diamond_graph(depth)
+        start = time.perf_counter()
+        self.assertEqual(main.add_height(graph, main.FAKE_ROOT), 2 * depth + 1)
+        self.assertLess(time.perf_counter() - start, 1.0)
+        self.assertEqual(graph['top_0']['height'], 2 * depth)
+        self.assertEqual(graph[f'left_{depth - 1}']['height'], 1)
+
+    def test_add_height_cycle(self):
+        graph = {
+            main.FAKE_ROOT: {'children': ['a']},
+            'a': {'children': ['b']},
+            'b': {'children': ['a']},
+        }
+        with self.assertRaises(ValueError):
+            main.add_height(graph, main.FAKE_ROOT)
+
+    def test_apply_heights(self):
+        graph = {
+            'a': {'children': ['b', 'c']},
+            'b': {'children': ['d'], 'bazelized': True},
+            'c': {'children': []},
+            'd': {'children': []},
+            'e': {'children': ['d']},
+        }
+        heights = main.compute_heights(graph, list(graph))
+        subtree = main.extract_subtree(graph, 'a')
+        main.apply_heights(subtree, heights)
+        expected = main.extract_subtree(graph, 'a')
+        main.add_height(expected, main.FAKE_ROOT)
+        self.assertEqual(subtree, expected)
+        self.assertNotIn('height', subtree['d'])
+        self.assertNotIn('traversing_status', graph['a'])
+
+    def test_parse_jobs(self):
+        # Parsing in processes gives the same graph, in the same order.
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        source_dir = benchmark.generate_workspace(root, crates=40, diamond_depth=3)
+        serial = main.build_graph(source_dir, True, True, True, [], jobs=1)
+        parallel = main.build_graph(source_dir, True, True, True, [], jobs=2)
+        self.assertEqual(parallel, serial)
+        self.assertEqual(list(parallel), list(serial))
+        self.assertEqual([list(x) for x in parallel.values()], [list(x) for x in serial.values()])
+
+    def test_collect_reports(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        batch_file = os.path.join(root, 'batch.txt')
+        with open(batch_file, 'w') as f:
+            f.write('all no neato\nb yes\n')
+        args = argparse.Namespace(
+            root_packages=['all'], variants=[False, True], batch_file=batch_file, dev_dependencies=True,
+            output_dir=root, graphviz_engine='dot', graphviz_format='svg', count_missing=False,
+            count_missing_variants=[True])
+        reports = main.collect_reports(args)
+        self.assertEqual([x[:2] for x in reports], [('all', False), ('all', True), ('b', True)])
+        self.assertEqual(reports[0][2:], (os.path.join(root, 'all.csv'), os.path.join(root, 'all.gv'), 'neato', 'svg'))
+        self.assertEqual([main.counts_missing(args, x) for x in [False, True]], [False, True])
+
+    def test_patch_graph(self):
+        # Patched graph equals the graph built from new data.
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        data = main.scan_packages(benchmark.generate_workspace(root, crates=40, diamond_depth=3))
+        # Skip the workspace manifest, it has no package.
+        crates = [x for x in data if x['cargo_toml']['name'] is not None]
+        with_bazel = [x for x in crates if x['bazel_path'] is not None]
+        without_bazel = [x for x in crates if x['bazel_path'] is None]
+        force_migrated = []
+        graph = main.graph_from_packages(data, True, True, True, force_migrated)
+
+        def removed_bazel(entry):
+            entry['bazel_path'] = None
+            del entry['build_bazel']
+
+        def added_bazel(entry):
+            entry['bazel_path'] = entry['cargo_path'].replace('Cargo.toml', 'BUILD.bazel')
+            entry['build_bazel'] = [{'rule': 'rust_library', 'name': entry['cargo_toml']['name']}]
+
+        def edited_dependency(entry):
+            entry['cargo_toml']['dependencies'].append(crates[-1]['cargo_toml']['name'])
+
+        edits = [
+            (with_bazel[0]['cargo_path'], removed_bazel),
+            (without_bazel[0]['cargo_path'], added_bazel),
+            (crates[0]['cargo_path'], edited_dependency),
+            (None, None),
+        ]
+        for path, edit in edits:
+            new_data = copy.deepcopy(data)
+            new_force_migrated = force_migrated
+            if edit is None:
+                new_force_migrated = [crates[1]['cargo_toml']['name']]
+            else:
+                edit(next(x for x in new_data if x['cargo_path'] == path))
+            changed = main.patch_graph(graph, data, new_data, True, True, True, force_migrated, new_force_migrated)
+            self.assertTrue(changed)
+            self.assertEqual(graph, main.graph_from_packages(new_data, True, True, True, new_force_migrated))
+            data, force_migrated = new_data, new_force_migrated
+
+    def test_update_heights(self):
+        graph = {
+            'a': {'children': ['b', 'c']},
+            'b': {'children': ['d']},
+            'c': {'children': []},
+            'd': {'children': []},
+            'e': {'children': ['c']},
+        }
+        heights = main.compute_heights(graph, list(graph))
+        graph['d']['children'] = ['f']
+        graph['f'] = {'children': []}
+        affected = main.update_heights(graph, heights, {'d', 'f'})
+        self.assertEqual(affected, {'a', 'b', 'd', 'f'})
+        self.assertEqual(heights, main.compute_heights(graph, list(graph)))
+
+    def test_compute_dependents(self):
+        graph = {
+            'a': {'children': ['b', 'c']},
+            'b': {'children': ['d'], 'bazelized': True},
+            'c': {'children': ['d']},
+            'd': {'children': ['serde']},
+            'e': {'children': []},
+        }
+        dependents = main.compute_dependents(graph)
+        self.assertEqual(dependents, {'a': (0, 0), 'b': (1, 1), 'c': (1, 1), 'd': (3, 2), 'e': (0, 0)})
+        graph['d']['children'] = ['a']
+        with self.assertRaises(ValueError):
+            main.compute_dependents(graph)
+
+    def test_find_cycles(self):
+        graph = {
+            'a': {'children': ['b']},
+            'b': {'children': ['c', 'e']},
+            'c': {'children': ['a', 'd']},
+            'd': {'children': ['d']},
+            'e': {'children': ['f', 'serde']},
+            'f': {'children': ['e']},
+            'g': {'children': ['a']},
+        }
+        self.assertEqual(main.find_cycles(graph), [['a', 'b', 'c'], ['d'], ['e', 'f']])
+        self.assertEqual(main.find_cycles(diamond_graph(5000)), [])
+
+    def test_condense_cycles(self):
+        graph = {
+            'a': {'children': ['b'], 'bazelized': False, 'missing bin': 1},
+            'b': {'children': ['a', 'c'], 'bazelized': True, 'missing bin': 2},
+            'c': {'children': [], 'bazelized': True},
+            'd': {'children': ['b']},
+        }
+        condensed, names = main.condense_graph(graph)
+        self.assertEqual(names, {'a': 'a + b', 'b': 'a + b'})
+        self.assertEqual(list(condensed), ['a + b', 'c', 'd'])
+        self.assertEqual(condensed['a + b']['children'], ['c'])
+        self.assertEqual(condensed['a + b']['cycle'], ['a', 'b'])
+        self.assertFalse(condensed['a + b']['bazelized'])
+        self.assertEqual(condensed['a + b']['missing bin'], 3)
+        self.assertEqual(condensed['d']['children'], ['a + b'])
+        self.assertEqual(main.add_height(main.extract_subtree(condensed, 'd'), main.FAKE_ROOT), 2)
+        self.assertIs(main.condense_graph(condensed)[0], condensed)
+
+    def test_report_root(self):
+        # Cycle member with dev-dependencies, the dev node is the root.
+        graph = {
+            'a': {'children': ['b'], 'bazelized': False},
+            'b': {'children': ['a'], 'bazelized': False},
+            'c': {'children': [], 'bazelized': False},
+            'a-[dev]': {'children': ['c', 'a'], 'bazelized': False},
+        }
+        condensed, names = main.condense_graph(graph)
+        self.assertEqual(condensed['a-[dev]']['children'], ['c', 'a + b'])
+        self.assertEqual(main.report_root(condensed, 'a', names), 'a-[dev]')
+        self.assertEqual(main.report_root(condensed, 'b', names), 'a + b')
+        self.assertEqual(main.report_root(condensed, None, names), None)
+        subtree = main.extract_subtree(condensed, main.report_root(condensed, 'a', names))
+        self.assertEqual(sorted(subtree), sorted(['a-[dev]', 'c', 'a + b', main.FAKE_ROOT]))
+
+    def test_extract_subtree(self):
+        graph = diamond_graph(5000)
+        del graph[main.FAKE_ROOT]
+        start = time.perf_counter()
+        subtree = main.extract_subtree(graph, 'top_4990')
+        self.assertLess(time.perf_counter() - start, 1.0)
+        self.assertEqual(len(subtree), 31 + 1)
+        self.assertEqual(subtree[main.FAKE_ROOT]['children'], ['top_4990'])
+        subtree['top_4990']['height'] = 1
+        self.assertNotIn('height', graph['top_4990'])
+        self.assertNotIn(main.FAKE_ROOT, graph)
+        subtree = main.extract_subtree(graph, 'all')
+        self.assertEqual(len(subtree), len(graph) + 1)
+        self.assertEqual(subtree[main.FAKE_ROOT]['children'], ['top_0'])
+
+    def test_extract_subtree_cycle(self):
+        graph = {
+            'a': {'children': ['b']},
+            'b': {'children': ['c']},
+            'c': {'children': ['b']},
+        }
+        with self.assertRaisesRegex(ValueError, r"\['b', 'c', 'b'\]"):
+            main.extract_subtree(graph, 'a')
+
+    def test_compact_graph(self):
+        graph = {
+            'a': {'children': ['b', 'c', 'serde'], 'bazelized': False},
+            'a-[dev]': {'children': ['a', 'd'], 'bazelized': False, 'missing bench': 1},
+            'b': {'children': ['d'], 'bazelized': True, 'force_migrated': True},
+            'c': {'children': ['d'], 'bazelized': False},
+            'd': {'children': [], 'bazelized': False},
+            'e': {'children': ['d'], 'bazelized': False},
+        }
+        compact = CompactGraph.from_graph(graph)
+        self.assertEqual(list(compact), list(graph))
+        self.assertEqual(compact['a']['children'], ['b', 'c', 'serde'])
+        self.assertIsNone(compact.get('serde'))
+        heights = main.compute_heights(graph, list(graph))
+        for root in ['a', 'e', 'all']:
+            expected = main.extract_subtree(graph, root)
+            subtree = main.extract_subtree(compact, root)
+            for x in [expected, subtree]:
+                main.apply_heights(x, heights)
+                main.add_parent_count(x)
+            self.assertEqual(list(main.csv_rows(subtree)), list(main.csv_rows(expected)))
+            self.assertEqual(main.calculate_progress(subtree), main.calculate_progress(expected))
+        self.assertNotIn('height', compact['a'])
+
+    def test_csv_rows_order(self):
+        graph = {
+            main.FAKE_ROOT: {'children': ['a', 'b', 'c', 'd', 'e']},
+            'a': {'height': 1, 'parent_count': 1},
+            'b': {'height': 0, 'parent_count': 1},
+            'c': {'height': 0, 'parent_count': 3},
+            'd': {'height': 0, 'parent_count': 3, 'force_migrated': True},
+            'e': {'bazelized': True, 'parent_count': 5},
+        }
+        rows = list(main.csv_rows(graph))
+        self.assertEqual([x['name'] for x in rows], ['c', 'b', 'd', 'a', 'e'])
+        self.assertEqual(list(rows[0].keys()), main.CSV_COLUMNS)
+
+
+if __name__ == '__main__':
+    unittest.main()
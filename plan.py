@@ -0,0 +1,126 @@
+#!/usr/bin/python3
+import os
+import csv
+import heapq
+from common import FAKE_ROOT
+
+
+PLAN_COLUMNS = [
+    'name',
+    'wave',
+    'chain',
+    'critical',
+    'start',
+    'worker',
+]
+
+
+def migration_waves(graph):
+    # Kahn's algorithm over not migrated packages, a package is ready when
+    # all its not migrated children are migrated. Returns packages in
+    # topological order (children first), waves and not migrated parents.
+    nodes = [x for x in graph if x != FAKE_ROOT and not graph[x].get('bazelized', False)]
+    pending = {x: 0 for x in nodes}
+    parents = {x: [] for x in nodes}
+    for package_name in nodes:
+        for child in graph[package_name].get('children', []):
+            if child in pending:
+                pending[package_name] += 1
+                parents[child].append(package_name)
+    order = [x for x in nodes if pending[x] == 0]
+    waves = {x: 0 for x in order}
+    for package_name in order:
+        for parent in parents[package_name]:
+            waves[parent] = max(waves.get(parent, 0), waves[package_name] + 1)
+            pending[parent] -= 1
+            if pending[parent] == 0:
+                order.append(parent)
+    if len(order) != len(nodes):
+        cycle = sorted(x for x in nodes if pending[x] > 0)
+        raise ValueError(f'Unexpected graph cycle, see packages: {cycle}')
+    return order, waves, parents
+
+
+def dependent_chains(order, parents):
+    # Number of packages on the longest chain from a package up to the top,
+    # the package itself included.
+    chains = {}
+    for package_name in reversed(order):
+        chains[package_name] = 1 + max([chains[x] for x in parents[package_name]], default=0)
+    return chains
+
+
+def critical_path(order, waves, parents, chains):
+    # Longest chain of packages that have to be migrated one after another.
+    longest = max(chains.values(), default=0)
+    start = [x for x in order if waves[x] == 0 and chains[x] == longest]
+    path = start[:1]
+    while path and parents[path[-1]]:
+        path.append(max(parents[path[-1]], key=lambda x: (chains[x], x)))
+    return path
+
+
+def schedule(order, parents, chains, workers):
+    # List scheduling of unit time migrations on `workers` workers, the
+    # longest dependent chain first. Returns `{package: (start, worker)}`.
+    pending = {x: 0 for x in order}
+    for package_name in order:
+        for parent in parents[package_name]:
+            pending[parent] += 1
+    ready = [(-chains[x], x) for x in order if pending[x] == 0]
+    heapq.heapify(ready)
+    result = {}
+    time = 0
+    while ready:
+        batch = [heapq.heappop(ready)[1] for _ in range(min(workers, len(ready)))]
+        for worker, package_name in enumerate(batch):
+            result[package_name] = (time, worker)
+        for package_name in batch:
+            for parent in parents[package_name]:
+                pending[parent] -= 1
+                if pending[parent] == 0:
+                    heapq.heappush(ready, (-chains[parent], parent))
+        time += 1
+    return result
+
+
+def plan(graph, workers=1):
+    # Returns plan rows sorted by start time and worker, and a summary.
+    order, waves, parents = migration_waves(graph)
+    chains = dependent_chains(order, parents)
+    path = critical_path(order, waves, parents, chains)
+    slots = schedule(order, parents, chains, max(1, workers))
+    length = len(path)
+    rows = []
+    for package_name in order:
+        start, worker = slots[package_name]
+        rows.append({
+            'name': package_name,
+            'wave': waves[package_name],
+            'chain': chains[package_name],
+            'critical': 'yes' if waves[package_name] + chains[package_name] == length else 'no',
+            'start': start,
+            'worker': worker,
+        })
+    rows.sort(key=lambda x: (x['start'], x['worker']))
+    summary = {
+        'packages': len(order),
+        'waves': max(waves.values(), default=-1) + 1,
+        'critical path': path,
+        'schedule length': max([x['start'] for x in rows], default=-1) + 1,
+    }
+    return rows, summary
+
+
+def plan_path(csv_path):
+    # `packages.csv` -> `packages-plan.csv`.
+    base, _ = os.path.splitext(csv_path)
+    return f'{base}-plan.csv'
+
+
+def write_plan(rows, path):
+    with open(path, 'w+') as f:
+        writer = csv.DictWriter(f, PLAN_COLUMNS)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
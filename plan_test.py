@@ -0,0 +1,41 @@
+import unittest
+import main
+import plan
+
+
+class TestPlan(unittest.TestCase):
+
+    def setUp(self):
+        self.graph = main.extract_subtree({
+            'a': {'children': ['b', 'c']},
+            'b': {'children': ['d']},
+            'c': {'children': ['d', 'e']},
+            'd': {'children': []},
+            'e': {'children': [], 'bazelized': True},
+            'f': {'children': []},
+        }, None)
+
+    def test_migration_waves(self):
+        order, waves, _ = plan.migration_waves(self.graph)
+        self.assertEqual(set(order), {'a', 'b', 'c', 'd', 'f'})
+        self.assertEqual(waves, {'a': 2, 'b': 1, 'c': 1, 'd': 0, 'f': 0})
+
+    def test_plan(self):
+        rows, summary = plan.plan(self.graph, workers=2)
+        self.assertEqual(summary['waves'], 3)
+        self.assertEqual(summary['critical path'][0], 'd')
+        self.assertEqual(summary['critical path'][-1], 'a')
+        self.assertEqual(summary['schedule length'], 3)
+        starts = {x['name']: x['start'] for x in rows}
+        self.assertEqual(starts['d'], 0)
+        self.assertLess(starts['b'], starts['a'])
+        self.assertEqual([x['name'] for x in rows if x['critical'] == 'yes'], ['d', 'b', 'c', 'a'])
+
+    def test_cycle(self):
+        graph = {'a': {'children': ['b']}, 'b': {'children': ['a']}}
+        with self.assertRaises(ValueError):
+            plan.migration_waves(graph)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,35 @@
+#!/usr/bin/python3
+import subprocess
+
+
+DEFAULT_ENGINE = 'dot'
+DEFAULT_FORMAT = 'pdf'
+
+
+def output_path(source_path, format):
+    # Same naming as `graphviz.Digraph.render`: `graph.gv` -> `graph.gv.pdf`.
+    return f'{source_path}.{format}'
+
+
+def render(source_path, engine=DEFAULT_ENGINE, format=DEFAULT_FORMAT):
+    # Lay out a DOT file with an external Graphviz engine, returns
+    # `(output path, error message or None)`.
+    path = output_path(source_path, format)
+    try:
+        result = subprocess.run([engine, f'-T{format}', '-o', path, source_path],
+                                stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    except OSError as e:
+        return path, f'{engine}: {e}'
+    if result.returncode != 0:
+        return path, result.stderr.decode(errors='replace').strip() or f'{engine} exited with {result.returncode}'
+    return path, None
+
+
+def render_all(charts, jobs=None):
+    # Render `(source path, engine, format)` charts concurrently, every
+    # engine runs in its own process. Returns results in the same order.
+    from concurrent.futures import ThreadPoolExecutor
+    if not charts:
+        return []
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        return list(pool.map(lambda x: render(*x), charts))
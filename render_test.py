@@ -0,0 +1,18 @@
+import unittest
+import render
+
+
+class TestRender(unittest.TestCase):
+
+    def test_output_path(self):
+        self.assertEqual(render.output_path('output/all.gv', 'svg'), 'output/all.gv.svg')
+
+    def test_render_all_errors(self):
+        charts = [('a.gv', 'missing-graphviz-engine', 'pdf'), ('b.gv', 'missing-graphviz-engine', 'svg')]
+        results = render.render_all(charts, jobs=2)
+        self.assertEqual([x for x, _ in results], ['a.gv.pdf', 'b.gv.svg'])
+        self.assertTrue(all(error is not None for _, error in results))
+
+
+if __name__ == '__main__':
+    unittest.main()
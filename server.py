@@ -0,0 +1,227 @@
+#!/usr/bin/python3
+import json
+import argparse
+import threading
+import main
+from main import FAKE_ROOT, str2bool
+from cache import ParseCache, DEFAULT_MAX_ENTRIES
+from walk import DEFAULT_EXCLUDE
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class GraphState:
+    # Immutable once published: reload builds a new state, so queries never
+    # need a lock. Report subtrees are computed on first use and kept.
+
+    def __init__(self, data, raw_graph, graph, names, heights, dependents):
+        # `graph` is `raw_graph` with cycles condensed, `names` maps cycle
+        # members to condensed package names.
+        self.data = data
+        self.raw_graph = raw_graph
+        self.graph = graph
+        self.names = names
+        self.heights = heights
+        self.dependents = dependents
+        self.parents = {}
+        for package_name in graph:
+            for child in graph[package_name].get('children', []):
+                self.parents.setdefault(child, []).append(package_name)
+        self.subtrees = {}
+
+    def subtree(self, root_package):
+        root_package = main.report_root(self.graph, root_package, self.names)
+        subtree = self.subtrees.get(root_package)
+        if subtree is None:
+            subtree = main.extract_subtree(self.graph, root_package)
+            main.apply_heights(subtree, self.heights)
+            main.apply_dependents(subtree, self.dependents)
+            main.add_parent_count(subtree)
+            self.subtrees[root_package] = subtree
+        return subtree
+
+
+class QueryService:
+    # Keeps one graph per dev-dependencies mode in memory.
+
+    def __init__(self, args):
+        self.args = args
+        self.cache = ParseCache(args.cache_path or None, DEFAULT_MAX_ENTRIES)
+        if args.cache_path:
+            self.cache.load()
+        self.lock = threading.Lock()
+        self.files = main.watched_files(args.source_dir, args.exclude, args.force_migrated_file)
+        self.force_migrated = self.read_force_migrated()
+        data = main.scan_packages(args.source_dir, self.cache, args.jobs, args.exclude)
+        self.cache.save()
+        self.states = {}
+        for dev_dependencies in [False, True]:
+            raw_graph = main.graph_from_packages(
+                data, args.skip_3rd_party, dev_dependencies, args.count_missing, self.force_migrated)
+            graph, names = main.condense_graph(raw_graph)
+            self.states[dev_dependencies] = GraphState(
+                data, raw_graph, graph, names, main.compute_heights(graph, list(graph)), main.compute_dependents(graph))
+
+    def read_force_migrated(self):
+        return main.read(self.args.force_migrated_file).strip().split('\n')
+
+    def reload(self):
+        # Re-parse changed files only, patch copies of the graphs and publish them.
+        args = self.args
+        with self.lock:
+            files = main.watched_files(args.source_dir, args.exclude, args.force_migrated_file)
+            if files == self.files:
+                return {'changed': 0}
+            self.files = files
+            force_migrated = self.read_force_migrated()
+            data = main.scan_packages(args.source_dir, self.cache, args.jobs, args.exclude)
+            self.cache.save()
+            result = {'changed': 0}
+            for dev_dependencies, state in list(self.states.items()):
+                raw_graph = dict(state.raw_graph)
+                changed = main.patch_graph(
+                    raw_graph, state.data, data, args.skip_3rd_party, dev_dependencies, args.count_missing,
+                    self.force_migrated, force_migrated)
+                graph, names = main.condense_graph(raw_graph)
+                if names or state.names:
+                    # Package names changed, recalculate all heights.
+                    heights = main.compute_heights(graph, list(graph))
+                else:
+                    heights = dict(state.heights)
+                    main.update_heights(graph, heights, changed)
+                dependents = main.compute_dependents(graph) if changed else state.dependents
+                self.states[dev_dependencies] = GraphState(data, raw_graph, graph, names, heights, dependents)
+                result['changed'] += len(changed)
+            self.force_migrated = force_migrated
+            return result
+
+    def progress(self, root_package, dev_dependencies):
+        subtree = self.states[dev_dependencies].subtree(root_package)
+        bazel_n, total, ratio = main.calculate_progress(subtree)
+        return {'bazel': bazel_n, 'no bazel': total - bazel_n, 'total': total, 'progress': ratio}
+
+    def subtree(self, root_package, dev_dependencies):
+        subtree = self.states[dev_dependencies].subtree(root_package)
+        names = [x for x in subtree if x != FAKE_ROOT]
+        return {
+            'nodes': names,
+            'edges': [[x, y] for x in names for y in subtree[x].get('children', [])],
+        }
+
+    def package(self, package_name, dev_dependencies):
+        state = self.states[dev_dependencies]
+        package_name = state.names.get(package_name, package_name)
+        info = state.graph.get(package_name)
+        if info is None:
+            raise KeyError(package_name)
+        height = state.heights.get(package_name, -1)
+        dependents, not_migrated_dependents = state.dependents[package_name]
+        return {
+            'name': package_name,
+            'bazel': info.get('bazelized', False),
+            'forced': info.get('force_migrated', False),
+            'height': height if height >= 0 else None,
+            'parents': state.parents.get(package_name, []),
+            'children': info.get('children', []),
+            'transitive dependents': dependents,
+            'transitive non-migrated dependents': not_migrated_dependents,
+        }
+
+    def rows(self, root_package, dev_dependencies):
+        return list(main.csv_rows(self.states[dev_dependencies].subtree(root_package)))
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    # GET /progress, /subtree, /csv with `root` and `dev` parameters,
+    # GET /package with `name` and `dev`, POST /reload.
+
+    def send_json(self, status, value):
+        body = json.dumps(value).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {x: y[-1] for x, y in parse_qs(url.query).items()}
+        service = self.server.service
+        try:
+            dev_dependencies = str2bool(params.get('dev', 'yes'))
+            root_package = params.get('root')
+            if url.path == '/progress':
+                result = service.progress(root_package, dev_dependencies)
+            elif url.path == '/subtree':
+                result = service.subtree(root_package, dev_dependencies)
+            elif url.path == '/package':
+                result = service.package(params.get('name'), dev_dependencies)
+            elif url.path == '/csv':
+                result = service.rows(root_package, dev_dependencies)
+            else:
+                self.send_json(404, {'error': f'Unknown query: {url.path}'})
+                return
+        except KeyError as e:
+            self.send_json(404, {'error': f'Unknown package: {e}'})
+            return
+        except (ValueError, argparse.ArgumentTypeError) as e:
+            self.send_json(400, {'error': str(e)})
+            return
+        self.send_json(200, result)
+
+    def do_POST(self):
+        if urlparse(self.path).path != '/reload':
+            self.send_json(404, {'error': f'Unknown query: {self.path}'})
+            return
+        self.send_json(200, self.server.service.reload())
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+def serve(service, host, port, verbose=False):
+    server = ThreadingHTTPServer((host, port), RequestHandler)
+    server.service = service
+    server.verbose = verbose
+    return server
+
+
+def run():
+    # Parse agruments.
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '-sd', '--source_dir', help='source directory', default='../ic/rs/')
+    parser.add_argument(
+        '-s3p', '--skip_3rd_party', help='skip 3rd party package dependencies', type=str2bool, default=True)
+    parser.add_argument(
+        '-mis', '--count_missing', help='count missing Cargo attributes in Bazel files', type=str2bool, default=False)
+    parser.add_argument(
+        '-f', '--force_migrated_file', help='input file with a list of packages, considered migrated', default='./force_migrated.txt')
+    parser.add_argument(
+        '-cp', '--cache_path', help='parse cache file, empty to disable', default='./.cache/parse_cache.json')
+    parser.add_argument(
+        '-j', '--jobs', help='number of processes parsing files', type=int, default=1)
+    parser.add_argument(
+        '-ex', '--exclude', help='directory name patterns skipped while scanning', nargs='*', default=DEFAULT_EXCLUDE)
+    parser.add_argument(
+        '-H', '--host', help='address to listen on', default='127.0.0.1')
+    parser.add_argument(
+        '-p', '--port', help='port to listen on', type=int, default=8000)
+    parser.add_argument(
+        '-v', '--verbose', help='log every request', type=str2bool, default=False)
+    args = parser.parse_args()
+
+    service = QueryService(args)
+    server = serve(service, args.host, args.port, args.verbose)
+    print(f'Serving {args.source_dir} on http://{args.host}:{server.server_port}, press Ctrl+C to stop...')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    run()
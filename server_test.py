@@ -0,0 +1,62 @@
+import os
+import json
+import shutil
+import argparse
+import tempfile
+import unittest
+import threading
+import urllib.request
+import benchmark
+import server
+
+
+class TestServer(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        source_dir = benchmark.generate_workspace(self.root, crates=20, diamond_depth=2, bazel_coverage=0.5)
+        force_migrated_file = os.path.join(self.root, 'force_migrated.txt')
+        with open(force_migrated_file, 'w') as f:
+            f.write('bench-crate-19\n')
+        args = argparse.Namespace(
+            source_dir=source_dir, skip_3rd_party=True, count_missing=False, force_migrated_file=force_migrated_file,
+            cache_path='', jobs=1, exclude=server.DEFAULT_EXCLUDE)
+        self.server = server.serve(server.QueryService(args), '127.0.0.1', 0)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+        self.url = f'http://127.0.0.1:{self.server.server_port}'
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+        shutil.rmtree(self.root)
+
+    def query(self, path, method='GET'):
+        request = urllib.request.Request(self.url + path, method=method)
+        with urllib.request.urlopen(request) as response:
+            return json.loads(response.read())
+
+    def test_queries(self):
+        progress = self.query('/progress?root=all&dev=no')
+        self.assertEqual(progress['total'], 20 + 2 * 3 + 1)
+        package = self.query('/package?name=diamond-top-1&dev=no')
+        self.assertEqual(package['parents'], ['diamond-left-0', 'diamond-right-0'])
+        subtree = self.query('/subtree?root=diamond-top-1&dev=no')
+        self.assertEqual(len(subtree['nodes']), 3)
+        rows = self.query('/csv?root=all')
+        self.assertEqual(rows[-1]['name'], 'bench-crate-19')
+        with self.assertRaises(urllib.error.HTTPError):
+            self.query('/package?name=unknown')
+
+    def test_reload(self):
+        self.assertEqual(self.query('/reload', 'POST'), {'changed': 0})
+        with open(self.server.service.args.force_migrated_file, 'w') as f:
+            f.write('diamond-top-1\n')
+        self.assertGreater(self.query('/reload', 'POST')['changed'], 0)
+        package = self.query('/package?name=diamond-top-1&dev=no')
+        self.assertTrue(package['forced'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,204 @@
+#!/usr/bin/python3
+import csv
+import argparse
+import main
+from main import FAKE_ROOT, str2bool
+from cache import ParseCache, DEFAULT_MAX_ENTRIES
+from walk import DEFAULT_EXCLUDE
+
+
+SIMULATION_COLUMNS = [
+    'scenario',
+    'packages',
+    'bazel',
+    'total',
+    'progress',
+    'progress delta',
+    'max height',
+    'max height delta',
+    'ready',
+    'ready delta',
+    'updated heights',
+]
+
+
+class Simulator:
+    # Evaluates "what if these packages were migrated" scenarios on a root
+    # package subtree. The graph is not modified, every scenario recalculates
+    # heights of not migrated ancestors of its packages only.
+
+    def __init__(self, graph, root_package):
+        self.subtree = main.extract_subtree(graph, root_package)
+        # Unlike reports, packages behind migrated ones get heights too.
+        self.heights = main.compute_heights(self.subtree, list(self.subtree))
+        self.bazel_n, self.total, self.ratio = main.calculate_progress(self.subtree)
+        self.ready = sum(1 for x, y in self.heights.items() if y == 0 and x != FAKE_ROOT)
+        self.parents = {}
+        for package_name in self.subtree:
+            for child in self.subtree[package_name].get('children', []):
+                self.parents.setdefault(child, []).append(package_name)
+
+    def is_migrated(self, package_name):
+        return self.subtree[package_name].get('bazelized', False)
+
+    def candidates(self):
+        # Not migrated packages, each one is a single package scenario.
+        return [x for x in self.subtree if x != FAKE_ROOT and not self.is_migrated(x)]
+
+    def ancestors(self, migrated):
+        # Not migrated ancestors, migrated packages stop the propagation.
+        result = set()
+        stack = list(migrated)
+        while stack:
+            for parent in self.parents.get(stack.pop(), []):
+                if parent not in result and parent not in migrated and not self.is_migrated(parent):
+                    result.add(parent)
+                    stack.append(parent)
+        return result
+
+    def scenario_heights(self, migrated):
+        # Heights of packages changed by the scenario, others stay the same.
+        affected = self.ancestors(migrated)
+        heights = {x: -1 for x in migrated}
+        stack = [(x, False) for x in affected]
+        while stack:
+            package_name, is_expanded = stack.pop()
+            children = self.subtree[package_name].get('children', [])
+            if is_expanded:
+                height = -1
+                for child in children:
+                    height = max(height, heights.get(child, self.heights[child]))
+                heights[package_name] = height + 1
+                continue
+            if package_name in heights:
+                continue
+            stack.append((package_name, True))
+            stack.extend((x, False) for x in children if x in affected and x not in heights)
+        return heights
+
+    def evaluate(self, scenario, name=None):
+        migrated = {x for x in scenario if x in self.subtree and x != FAKE_ROOT and not self.is_migrated(x)}
+        heights = self.scenario_heights(migrated)
+
+        updated = 0
+        ready = self.ready
+        for package_name, height in heights.items():
+            old_height = self.heights[package_name]
+            if package_name == FAKE_ROOT or old_height == height:
+                continue
+            updated += 1
+            ready += (height == 0) - (old_height == 0)
+
+        bazel_n = self.bazel_n + len(migrated)
+        max_height = heights.get(FAKE_ROOT, self.heights[FAKE_ROOT]) - 1
+        return {
+            'scenario': name or ' '.join(scenario),
+            'packages': len(migrated),
+            'bazel': bazel_n,
+            'total': self.total,
+            'progress': f'{100*bazel_n/self.total:.01f}',
+            'progress delta': f'{100*len(migrated)/self.total:.01f}',
+            'max height': max_height,
+            'max height delta': max_height - (self.heights[FAKE_ROOT] - 1),
+            'ready': ready,
+            'ready delta': ready - self.ready,
+            'updated heights': updated,
+        }
+
+    def rank(self, scenarios):
+        # Evaluate `(name, packages)` scenarios, best scenarios first.
+        rows = [self.evaluate(packages, name) for name, packages in scenarios]
+        return sorted(rows, key=simulation_order)
+
+
+def simulation_order(row):
+    # Lowest max height first, then most packages ready to migrate, then
+    # highest progress.
+    return (row['max height'], -row['ready'], -row['bazel'], row['scenario'])
+
+
+def simulate(graph, root_package, scenarios):
+    return Simulator(graph, root_package).rank(scenarios)
+
+
+def read_scenarios(path):
+    # Each line is a scenario: `[<name>:] <package> [<package> ...]`.
+    scenarios = []
+    for line in main.read(path).split('\n'):
+        line = line.split('#')[0].strip()
+        if not line:
+            continue
+        name = None
+        if ':' in line:
+            name, line = [x.strip() for x in line.split(':', 1)]
+        scenarios.append((name, line.replace(',', ' ').split()))
+    return scenarios
+
+
+def write_simulation(rows, path):
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=SIMULATION_COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def run():
+    # Parse agruments.
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '-sd', '--source_dir', help='source directory', default='../ic/rs/')
+    parser.add_argument('-rp', '--root_package',
+                        help='root package', default=None)
+    parser.add_argument(
+        '-s3p', '--skip_3rd_party', help='skip 3rd party package dependencies', type=str2bool, default=True)
+    parser.add_argument(
+        '-dev', '--dev_dependencies', help='show dev-dependencies', type=str2bool, default=True)
+    parser.add_argument(
+        '-f', '--force_migrated_file', help='input file with a list of packages, considered migrated', default='./force_migrated.txt')
+    parser.add_argument(
+        '-cp', '--cache_path', help='parse cache file, empty to disable', default='./.cache/parse_cache.json')
+    parser.add_argument(
+        '-j', '--jobs', help='number of processes parsing files', type=int, default=1)
+    parser.add_argument(
+        '-ex', '--exclude', help='directory name patterns skipped while scanning', nargs='*', default=DEFAULT_EXCLUDE)
+    parser.add_argument(
+        '-sf', '--scenarios_file', help='input file with `[<name>:] <package> ...` scenario lines', default=None)
+    parser.add_argument(
+        '-sp', '--single_packages', help='add a scenario for every not migrated package', type=str2bool, default=False)
+    parser.add_argument(
+        '-csv', '--csv_path', help='CSV output file', default='./output/simulation.csv')
+    parser.add_argument(
+        '-top', '--top', help='number of best scenarios to print', type=int, default=10)
+    args = parser.parse_args()
+
+    force_migrated = main.read(args.force_migrated_file).strip().split('\n')
+    cache = None
+    if args.cache_path:
+        cache = ParseCache(args.cache_path, DEFAULT_MAX_ENTRIES).load()
+    graph = main.build_graph(
+        args.source_dir, skip_3rd_party=args.skip_3rd_party, dev_dependencies=args.dev_dependencies,
+        count_missing=False, force_migrated=force_migrated, cache=cache, jobs=args.jobs, exclude=args.exclude)
+    if cache is not None:
+        cache.save()
+    # Cycle members are migrated together.
+    graph, names = main.condense_graph(graph)
+
+    simulator = Simulator(graph, main.report_root(graph, args.root_package, names))
+    scenarios = read_scenarios(args.scenarios_file) if args.scenarios_file else []
+    scenarios = [(x, [names.get(package_name, package_name) for package_name in y]) for x, y in scenarios]
+    if args.single_packages:
+        scenarios += [(x, [x]) for x in simulator.candidates()]
+    rows = simulator.rank(scenarios)
+    write_simulation(rows, args.csv_path)
+
+    print('')
+    print(f'Root package: {main.report_name(args.root_package, args.dev_dependencies)}')
+    print(f'Scenarios: {len(rows)}, current max height / ready: '
+          f'{simulator.heights[FAKE_ROOT] - 1} / {simulator.ready}')
+    for row in rows[:args.top]:
+        print(f'{row["scenario"]}: max height {row["max height"]} ({row["max height delta"]:+}), '
+              f'ready {row["ready"]} ({row["ready delta"]:+}), progress {row["progress"]}%')
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,45 @@
+import unittest
+import main
+import simulate
+from main import FAKE_ROOT
+
+
+def sample_graph():
+    return {
+        'a': {'children': ['b', 'c']},
+        'b': {'children': ['d']},
+        'c': {'children': ['d', 'e']},
+        'd': {'children': ['f']},
+        'e': {'children': [], 'bazelized': True},
+        'f': {'children': []},
+        'g': {'children': ['f']},
+    }
+
+
+class TestSimulate(unittest.TestCase):
+
+    def test_evaluate_matches_full_recalculation(self):
+        graph = sample_graph()
+        simulator = simulate.Simulator(graph, 'a')
+        for scenario in [['d'], ['f'], ['b', 'f'], ['c', 'd'], ['e'], ['unknown']]:
+            row = simulator.evaluate(scenario)
+            migrated = sample_graph()
+            for package_name in scenario:
+                if package_name in migrated:
+                    migrated[package_name]['bazelized'] = True
+            subtree = main.extract_subtree(migrated, 'a')
+            heights = main.compute_heights(subtree, list(subtree))
+            bazel_n, _, _ = main.calculate_progress(subtree)
+            self.assertEqual(row['bazel'], bazel_n)
+            self.assertEqual(row['max height'], heights[FAKE_ROOT] - 1)
+            self.assertEqual(row['ready'], sum(1 for x, y in heights.items() if y == 0 and x != FAKE_ROOT))
+        self.assertNotIn('bazelized', graph['d'])
+
+    def test_rank(self):
+        rows = simulate.simulate(sample_graph(), 'a', [('b', ['b']), ('f', ['f']), ('g', ['g'])])
+        self.assertEqual([x['scenario'] for x in rows], ['f', 'b', 'g'])
+        self.assertEqual(rows[2]['packages'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
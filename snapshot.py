@@ -0,0 +1,149 @@
+#!/usr/bin/python3
+import os
+import json
+import argparse
+from common import read, report_name
+
+
+# Bump when the snapshot format changes.
+SNAPSHOT_VERSION = 1
+# Optional integer node attributes, `None` when not set.
+SNAPSHOT_COUNTS = [
+    'missing bin',
+    'missing lib',
+    'missing bench',
+]
+
+
+def snapshot_path(path, dev_dependencies):
+    # `graph.json` for the main graph and `graph-dev.json` with dev-dependencies.
+    base, ext = os.path.splitext(path)
+    return f'{report_name(base, dev_dependencies)}{ext}'
+
+
+def dumps(graph, meta=None):
+    # Package names are stored once, nodes refer to children by index:
+    # `[bazelized, force_migrated, [children], missing bin, missing lib, missing bench]`.
+    names = list(graph)
+    ids = {x: i for i, x in enumerate(names)}
+    nodes = []
+    for package_name in list(names):
+        info = graph[package_name]
+        children = []
+        for child in info.get('children', []):
+            if child not in ids:
+                ids[child] = len(names)
+                names.append(child)
+            children.append(ids[child])
+        nodes.append([int(info.get('bazelized', False)), int(info.get('force_migrated', False)), children] +
+                     [info.get(x) for x in SNAPSHOT_COUNTS])
+    data = {
+        'version': SNAPSHOT_VERSION,
+        'meta': meta or {},
+        'names': names,
+        'nodes': nodes,
+    }
+    return json.dumps(data, separators=(',', ':'))
+
+
+def loads(text):
+    data = json.loads(text)
+    if data.get('version') != SNAPSHOT_VERSION:
+        raise ValueError(f'Unsupported snapshot version: {data.get("version")}')
+    names = data['names']
+    graph = {}
+    for package_name, node in zip(names, data['nodes']):
+        info = {
+            'bazelized': bool(node[0]),
+            'children': [names[x] for x in node[2]],
+            'force_migrated': bool(node[1]),
+        }
+        for key, value in zip(SNAPSHOT_COUNTS, node[3:]):
+            if value is not None:
+                info[key] = value
+        graph[package_name] = info
+    return graph, data['meta']
+
+
+def dump(graph, path, meta=None):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'w') as f:
+        f.write(dumps(graph, meta))
+
+
+def load(path):
+    return loads(read(path))
+
+
+def compare(old, new, root_package=None):
+    # Linear diff of two graphs.
+    result = {
+        'new packages': [x for x in new if x not in old],
+        'removed packages': [x for x in old if x not in new],
+        'newly migrated': [],
+        'no longer migrated': [],
+        'new edges': [],
+        'removed edges': [],
+    }
+    for package_name, info in new.items():
+        old_info = old.get(package_name, {})
+        is_migrated = info.get('bazelized', False)
+        was_migrated = old_info.get('bazelized', False)
+        if package_name in old and is_migrated != was_migrated:
+            key = 'newly migrated' if is_migrated else 'no longer migrated'
+            result[key].append(package_name)
+        old_children = set(old_info.get('children', []))
+        result['new edges'] += [(package_name, x) for x in info.get('children', []) if x not in old_children]
+    for package_name, info in old.items():
+        new_children = set(new.get(package_name, {}).get('children', []))
+        result['removed edges'] += [(package_name, x) for x in info.get('children', []) if x not in new_children]
+
+    old_progress = progress(old, root_package)
+    new_progress = progress(new, root_package)
+    result['progress'] = (old_progress, new_progress)
+    return result
+
+
+def progress(graph, root_package):
+    # Cycles are condensed into single packages, same as in reports. Main
+    # module is imported on first use, it imports this module.
+    import main
+    graph, names = main.condense_cycles(graph, main.find_cycles(graph))
+    return main.calculate_progress(main.extract_subtree(graph, main.report_root(graph, root_package, names)))
+
+
+def print_comparison(result):
+    (old_bazel, old_total, old_ratio), (new_bazel, new_total, new_ratio) = result['progress']
+    print(f'Packages with bazel / total / progress: {old_bazel} / {old_total} / {100*old_ratio:>5.01f}%'
+          f' -> {new_bazel} / {new_total} / {100*new_ratio:>5.01f}% ({100*(new_ratio-old_ratio):+.01f}%)')
+    for key in ['newly migrated', 'no longer migrated', 'new packages', 'removed packages']:
+        print(f'{key.capitalize()}: {len(result[key])}')
+        for package_name in result[key]:
+            print(f'  {package_name}')
+    for key in ['new edges', 'removed edges']:
+        print(f'{key.capitalize()}: {len(result[key])}')
+        for parent, child in result[key]:
+            print(f'  {parent} -> {child}')
+
+
+def run():
+    # Parse agruments.
+    parser = argparse.ArgumentParser()
+    commands = parser.add_subparsers(dest='command', required=True)
+    compare_parser = commands.add_parser('compare', help='compare two graph snapshots')
+    compare_parser.add_argument('old', help='old snapshot file')
+    compare_parser.add_argument('new', help='new snapshot file')
+    compare_parser.add_argument('-rp', '--root_package',
+                                help='root package for progress', default=None)
+    args = parser.parse_args()
+
+    if args.command == 'compare':
+        old, _ = load(args.old)
+        new, _ = load(args.new)
+        print_comparison(compare(old, new, args.root_package))
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,43 @@
+import unittest
+import snapshot
+
+
+class TestSnapshot(unittest.TestCase):
+
+    def test_roundtrip(self):
+        graph = {
+            'a': {'bazelized': False, 'children': ['b', 'serde'], 'force_migrated': False,
+                  'missing bin': 1, 'missing lib': 0, 'missing bench': 0},
+            'b': {'bazelized': True, 'children': [], 'force_migrated': True},
+        }
+        loaded, meta = snapshot.loads(snapshot.dumps(graph, {'dev_dependencies': True}))
+        self.assertEqual(loaded, graph)
+        self.assertEqual(list(loaded), list(graph))
+        self.assertEqual(meta, {'dev_dependencies': True})
+
+    def test_version(self):
+        with self.assertRaises(ValueError):
+            snapshot.loads('{"version": 0}')
+
+    def test_compare(self):
+        old = {
+            'a': {'bazelized': False, 'children': ['b', 'c']},
+            'b': {'bazelized': False, 'children': []},
+            'c': {'bazelized': False, 'children': []},
+        }
+        new = {
+            'a': {'bazelized': False, 'children': ['b', 'd']},
+            'b': {'bazelized': True, 'children': []},
+            'd': {'bazelized': False, 'children': []},
+        }
+        result = snapshot.compare(old, new)
+        self.assertEqual(result['newly migrated'], ['b'])
+        self.assertEqual(result['new packages'], ['d'])
+        self.assertEqual(result['removed packages'], ['c'])
+        self.assertEqual(result['new edges'], [('a', 'd')])
+        self.assertEqual(result['removed edges'], [('a', 'c')])
+        self.assertEqual(result['progress'], ((0, 4, 0.0), (1, 4, 0.25)))
+
+
+if __name__ == '__main__':
+    unittest.main()
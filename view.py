@@ -0,0 +1,37 @@
+#!/usr/bin/python3
+from collections import ChainMap
+from collections.abc import Mapping
+
+
+class GraphView(Mapping):
+    # Read-only view of `graph` restricted to `nodes`, plus `extra` nodes on
+    # top (eg. a fake root). Attributes written to a node of the view are
+    # stored in the view, the underlying graph is never modified.
+
+    def __init__(self, graph, nodes, extra=None):
+        self.graph = graph
+        self.nodes = nodes  # List of node names in graph order.
+        self.members = set(nodes)
+        self.extra = extra or {}
+        self.overlays = {}
+
+    def __getitem__(self, package_name):
+        if package_name in self.extra:
+            return self.extra[package_name]
+        if package_name not in self.members:
+            raise KeyError(package_name)
+        node = self.overlays.get(package_name)
+        if node is None:
+            node = ChainMap({}, self.graph[package_name])
+            self.overlays[package_name] = node
+        return node
+
+    def __contains__(self, package_name):
+        return package_name in self.extra or package_name in self.members
+
+    def __iter__(self):
+        yield from self.nodes
+        yield from self.extra
+
+    def __len__(self):
+        return len(self.nodes) + len(self.extra)
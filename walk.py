@@ -0,0 +1,51 @@
+#!/usr/bin/python3
+import os
+from fnmatch import fnmatch
+
+
+# Directory names that never contain workspace crates.
+DEFAULT_EXCLUDE = [
+    '.git',
+    'target',
+    'bazel-*',
+    'node_modules',
+    'vendor',
+]
+
+
+def is_excluded(name, exclude):
+    return any(fnmatch(name, pattern) for pattern in exclude)
+
+
+def find_packages(source_dir, exclude=DEFAULT_EXCLUDE, stats=None):
+    # Walk directories depth-first in the same order as `Path.rglob`, without
+    # following symlinks and without descending into excluded directories.
+    # Yields `(cargo_path, bazel_path)` pairs, `bazel_path` is None if missing.
+    if stats is None:
+        stats = {}
+    stats.setdefault('directories', 0)
+    stats.setdefault('entries', 0)
+    stack = [str(source_dir)]
+    while stack:
+        directory = stack.pop()
+        stats['directories'] += 1
+        has_cargo = False
+        has_bazel = False
+        subdirs = []
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    stats['entries'] += 1
+                    if entry.is_dir(follow_symlinks=False):
+                        if not is_excluded(entry.name, exclude):
+                            subdirs.append(entry.path)
+                    elif entry.name == 'Cargo.toml':
+                        has_cargo = True
+                    elif entry.name == 'BUILD.bazel':
+                        has_bazel = True
+        except OSError:
+            continue
+        if has_cargo:
+            bazel_path = os.path.join(directory, 'BUILD.bazel') if has_bazel else None
+            yield os.path.join(directory, 'Cargo.toml'), bazel_path
+        stack.extend(reversed(subdirs))
@@ -0,0 +1,50 @@
+import os
+import shutil
+import tempfile
+import unittest
+from walk import find_packages, DEFAULT_EXCLUDE
+
+
+class TestWalk(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+
+    def touch(self, path):
+        path = os.path.join(self.root, path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        open(path, 'w').close()
+
+    def test_find_packages(self):
+        self.touch('a/Cargo.toml')
+        self.touch('a/BUILD.bazel')
+        self.touch('b/Cargo.toml')
+        self.touch('b/src/lib.rs')
+        self.touch('b/target/c/Cargo.toml')
+        self.touch('bazel-out/d/Cargo.toml')
+        stats = {}
+        packages = sorted(find_packages(self.root, DEFAULT_EXCLUDE, stats))
+        self.assertEqual(packages, [
+            (os.path.join(self.root, 'a', 'Cargo.toml'), os.path.join(self.root, 'a', 'BUILD.bazel')),
+            (os.path.join(self.root, 'b', 'Cargo.toml'), None),
+        ])
+        # Root, a, b, b/src. Entries: a, b, bazel-out, 2 in a, 3 in b, 1 in b/src.
+        self.assertEqual(stats, {'directories': 4, 'entries': 9})
+
+    def test_custom_exclude(self):
+        self.touch('a/Cargo.toml')
+        self.touch('b/target/Cargo.toml')
+        packages = list(find_packages(self.root, ['a']))
+        self.assertEqual(packages, [(os.path.join(self.root, 'b', 'target', 'Cargo.toml'), None)])
+
+    @unittest.skipIf(not hasattr(os, 'symlink'), 'symlinks are not supported')
+    def test_symlinks(self):
+        self.touch('a/Cargo.toml')
+        os.symlink(os.path.join(self.root, 'a'), os.path.join(self.root, 'link'))
+        packages = list(find_packages(self.root))
+        self.assertEqual(packages, [(os.path.join(self.root, 'a', 'Cargo.toml'), None)])
+
+
+if __name__ == '__main__':
+    unittest.main()